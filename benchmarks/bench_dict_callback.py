@@ -0,0 +1,275 @@
+"""
+Micro-benchmarks for the overhead of the dict_callback wrapper.
+
+Each scenario drives the function returned by `_DashDictCallbackPlugin.dictionaryize`
+inside a faked `dash.callback_context` and compares it with a raw positional callback,
+i.e. the function `app.callback` would have been given, doing the same work. For every
+scenario the per-call latency and the memory allocated per call are reported.
+
+Run it from the root of the repository with the package on the path, e.g.
+
+    PYTHONPATH=. python benchmarks/bench_dict_callback.py
+    python benchmarks/bench_dict_callback.py --filter all- --number 200
+    python benchmarks/bench_dict_callback.py --filter wide --lazy
+    python benchmarks/bench_dict_callback.py --save baseline.json
+    python benchmarks/bench_dict_callback.py --check baseline.json --tolerance 0.25
+
+With `--check` the script exits with a non-zero status when the overhead of any
+scenario grew by more than the tolerance compared to the saved results.
+"""
+import argparse
+import json
+import sys
+import timeit
+import tracemalloc
+from contextlib import contextmanager
+
+import flask
+from dash.dependencies import Input, Output, State, MATCH, ALL
+from dash_dict_callback import DashDictCallbackPlugin
+
+server = flask.Flask(__name__)
+
+
+@contextmanager
+def fake_callback_context(outputs_list, inputs_list, states_list=(), triggered=()):
+    """ Populates flask.g the way Dash does before it invokes a callback """
+    with server.test_request_context():
+        flask.g.outputs_list = outputs_list
+        flask.g.inputs_list = list(inputs_list)
+        flask.g.states_list = list(states_list)
+        flask.g.triggered_inputs = [{'prop_id': t, 'value': None} for t in triggered]
+        yield
+
+
+def values_of(prop_list):
+    """ The positional arguments Dash passes for a list of properties """
+    return [[p['value'] for p in each] if isinstance(each, list) else each['value'] for each in prop_list]
+
+
+def prop(id_, property, value=None):
+    return {'id': id_, 'property': property, 'value': value}
+
+
+class Scenario():
+    """
+    A benchmark scenario. dependencies are the declared Output/Input/State objects,
+    the *_list attributes are what the callback context holds for a request, dict_func
+    is the dict callback and raw_func the equivalent positional callback.
+    """
+
+    def __init__(self, name, dependencies, outputs_list, inputs_list, states_list, dict_func, raw_func):
+        self.name = name
+        self.dependencies = dependencies
+        self.outputs_list = outputs_list
+        self.inputs_list = inputs_list
+        self.states_list = states_list
+        self.dict_func = dict_func
+        self.raw_func = raw_func
+
+
+def plain_scenario(n):
+    outputs = [Output(f'out-{i}', 'children') for i in range(n)]
+    inputs = [Input(f'in-{i}', 'value') for i in range(n)]
+    states = [State(f'st-{i}', 'value') for i in range(n)]
+    keys = [(f'out-{i}.children', f'in-{i}.value') for i in range(n)]
+
+    def dict_func(inputs, states):
+        return {out: inputs[in_] for out, in_ in keys}
+
+    def raw_func(*args):
+        return list(args[:n])
+
+    return Scenario(f'plain-{n}', (outputs, inputs, states),
+                    [prop(f'out-{i}', 'children') for i in range(n)],
+                    [prop(f'in-{i}', 'value', i) for i in range(n)],
+                    [prop(f'st-{i}', 'value', i) for i in range(n)],
+                    dict_func, raw_func)
+
+
+def wide_state_scenario(n):
+    """ Many states used as context of which only a couple are read """
+    def dict_func(inputs, states):
+        return {'out.children': (inputs['in.value'], states['st-0.value'], states[f'st-{n - 1}.value'])}
+
+    def raw_func(value, *states):
+        return [(value, states[0], states[-1])]
+
+    return Scenario(f'wide-state-{n}', ([Output('out', 'children')], [Input('in', 'value')],
+                                       [State(f'st-{i}', 'value') for i in range(n)]),
+                    [prop('out', 'children')], [prop('in', 'value', 0)],
+                    [prop(f'st-{i}', 'value', i) for i in range(n)],
+                    dict_func, raw_func)
+
+
+def match_scenario():
+    def dict_func(inputs, states):
+        (id_, property), = inputs.pkeys()
+        output = DashDictCallbackPlugin.callback_dict()
+        output.pset(type='out', index=id_['index'], property='children', value=inputs.pget(id_, property))
+        return output
+
+    def raw_func(value):
+        return [value]
+
+    return Scenario('match', ([Output({'type': 'out', 'index': MATCH}, 'children')],
+                              [Input({'type': 'in', 'index': MATCH}, 'value')], []),
+                    [prop({'type': 'out', 'index': 7}, 'children')],
+                    [prop({'type': 'in', 'index': 7}, 'value', 'x')], [],
+                    dict_func, raw_func)
+
+
+def all_scenario(n, all_outputs):
+    outputs = [Output('total', 'children')]
+    outputs_list = [prop('total', 'children')]
+    if all_outputs:
+        outputs.append(Output({'type': 'out', 'index': ALL}, 'children'))
+        outputs_list.append([prop({'type': 'out', 'index': i}, 'children') for i in range(n)])
+
+    def dict_func(inputs, states):
+        output = DashDictCallbackPlugin.callback_dict()
+        output['total.children'] = sum(inputs.values())
+        if all_outputs:
+            for id_, property in inputs.pkeys():
+                output.pset(type='out', index=id_['index'], property='children', value=inputs.pget(id_, property))
+        return output
+
+    def raw_func(values):
+        if all_outputs:
+            return [sum(values), list(values)]
+        return [sum(values)]
+
+    return Scenario(f'all-{n}{"-out" if all_outputs else ""}',
+                    (outputs, [Input({'type': 'in', 'index': ALL}, 'value')], []),
+                    outputs_list, [[prop({'type': 'in', 'index': i}, 'value', i) for i in range(n)]], [],
+                    dict_func, raw_func)
+
+
+def pset_scenario(n):
+    """ Builds the output dictionary with pset, interning a pattern key per item """
+    def dict_func(inputs, states):
+        output = DashDictCallbackPlugin.callback_dict()
+        for index in range(n):
+            output.pset(type='out', index=index, property='children', value=index)
+        return {'total.children': output.pget(type='out', index=n - 1, property='children')}
+
+    def raw_func(value):
+        output = {}
+        for index in range(n):
+            output[('out', index, 'children')] = index
+        return [output[('out', n - 1, 'children')]]
+
+    return Scenario(f'pset-{n}', ([Output('total', 'children')], [Input('in', 'value')], []),
+                    [prop('total', 'children')], [prop('in', 'value', 0)], [], dict_func, raw_func)
+
+
+def context_scenario(n):
+    """ An ALL callback without declared dependencies, as with a bare @dictionary """
+    scenario = all_scenario(n, True)
+    scenario.name = f'context-{n}'
+    scenario.dependencies = None
+    return scenario
+
+
+SCENARIOS = [
+    plain_scenario(4),
+    plain_scenario(40),
+    wide_state_scenario(200),
+    match_scenario(),
+    all_scenario(1000, False),
+    all_scenario(5000, False),
+    all_scenario(5000, True),
+    pset_scenario(5000),
+    context_scenario(5000),
+]
+
+
+def measure(func, args, number):
+    """ Returns the mean latency in microseconds and the bytes allocated by a single call """
+    func(*args)  # warm up, also compiles any lazily built state
+    seconds = min(timeit.repeat(lambda: func(*args), number=number, repeat=3)) / number
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds * 1e6, peak - before
+
+
+def run(scenario, strict, allow_missing, number, **options):
+    wrapped = DashDictCallbackPlugin.dictionaryize(allow_missing, strict, scenario.dict_func,
+                                                   dependencies=scenario.dependencies, **options)
+    args = values_of(scenario.inputs_list) + values_of(scenario.states_list)
+    with fake_callback_context(scenario.outputs_list, scenario.inputs_list, scenario.states_list):
+        dict_us, dict_bytes = measure(wrapped, args, number)
+        raw_us, raw_bytes = measure(scenario.raw_func, args, number)
+    return {
+        'scenario': scenario.name,
+        'strict': strict,
+        'allow_missing': allow_missing,
+        'dict_us': dict_us,
+        'raw_us': raw_us,
+        'overhead_us': dict_us - raw_us,
+        'dict_bytes': dict_bytes,
+        'raw_bytes': raw_bytes,
+    }
+
+
+def result_key(result):
+    return f"{result['scenario']} strict={result['strict']} allow_missing={result['allow_missing']}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=100, help='calls per timing repeat')
+    parser.add_argument('--filter', default='', help='only run scenarios whose name contains this')
+    parser.add_argument('--save', help='write the results as json to this file')
+    parser.add_argument('--check', help='compare the overhead against results saved with --save')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative overhead growth')
+    parser.add_argument('--lazy', action='store_true', help='run the dict callbacks with lazy=True')
+    options = parser.parse_args(argv)
+
+    results = []
+    print(f"{'scenario':<16}{'strict':>7}{'missing':>8}{'dict us':>11}{'raw us':>11}"
+          f"{'overhead':>11}{'dict KiB':>10}{'raw KiB':>9}")
+    for scenario in SCENARIOS:
+        if options.filter not in scenario.name:
+            continue
+        for strict in (False, True):
+            for allow_missing in (True, False):
+                try:
+                    result = run(scenario, strict, allow_missing, options.number, lazy=options.lazy)
+                except Exception as e:
+                    print(f"{scenario.name:<16}{strict!s:>7}{allow_missing!s:>8}  failed: {e!r}")
+                    continue
+                results.append(result)
+                print(f"{result['scenario']:<16}{strict!s:>7}{allow_missing!s:>8}"
+                      f"{result['dict_us']:>11.1f}{result['raw_us']:>11.1f}{result['overhead_us']:>11.1f}"
+                      f"{result['dict_bytes'] / 1024:>10.1f}{result['raw_bytes'] / 1024:>9.1f}")
+
+    if options.save:
+        with open(options.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if options.check:
+        with open(options.check) as f:
+            baseline = {result_key(result): result for result in json.load(f)}
+        regressions = []
+        for result in results:
+            previous = baseline.get(result_key(result))
+            if previous is None:
+                continue
+            # Allow a microsecond of jitter so tiny scenarios don't flap
+            limit = previous['overhead_us'] * (1 + options.tolerance) + 1.0
+            if result['overhead_us'] > limit:
+                regressions.append(f"{result_key(result)}: {previous['overhead_us']:.1f}us -> "
+                                   f"{result['overhead_us']:.1f}us")
+        if regressions:
+            print('Overhead regressions:\n  ' + '\n  '.join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
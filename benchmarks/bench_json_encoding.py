@@ -0,0 +1,78 @@
+"""
+Benchmark of the JSON encoding of callback responses, comparing the encoder Dash
+uses (json with the PlotlyJSONEncoder) with the one of dict_callback(fast_json=True).
+
+    PYTHONPATH=. python benchmarks/bench_json_encoding.py
+    python benchmarks/bench_json_encoding.py --points 100000 --number 5
+
+The fast encoder uses orjson when it is installed. NumPy payloads, encoded both as
+JSON numbers and as base64 typed arrays (binary_arrays), are only benchmarked when
+NumPy is installed. The typed arrays are built by encode.binary_figure, as
+dict_callback(binary_arrays=True) does for figure outputs, and are timed with the
+encoding.
+"""
+import argparse
+import datetime
+import random
+import sys
+import timeit
+
+import plotly.graph_objects as go
+
+from dash_dict_callback import encode
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def response(value):
+    return {'response': {'graph': {'figure': value}}, 'multi': True}
+
+
+def payloads(points):
+    rng = random.Random(0)
+    xs = [rng.random() for _ in range(points)]
+    ys = [rng.random() for _ in range(points)]
+    yield 'figure-lists', response(go.Figure(go.Scatter(x=xs, y=ys)))
+    yield 'figure-dict', response({'data': [{'type': 'scatter', 'x': xs, 'y': ys}]})
+    start = datetime.datetime(2020, 1, 1)
+    yield 'table-rows', response([{'date': start + datetime.timedelta(minutes=i), 'value': xs[i], 'label': f'row {i}'}
+                                  for i in range(points // 10)])
+    if numpy is not None:
+        yield 'figure-numpy', response({'data': [{'type': 'scatter', 'x': numpy.array(xs), 'y': numpy.array(ys)}]})
+
+
+def binary_dumps(value):
+    figure = value['response']['graph']['figure']
+    return encode.dumps(response(encode.binary_figure(figure)))
+
+
+def measure(func, value, number):
+    func(value)
+    return min(timeit.repeat(lambda: func(value), number=number, repeat=3)) / number * 1e3
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=20000, help='points per trace')
+    parser.add_argument('--number', type=int, default=10, help='encodings per timing repeat')
+    options = parser.parse_args(argv)
+
+    print(f"fast encoder: {'orjson ' + encode.orjson.__version__ if encode.orjson else 'json (orjson not installed)'}")
+    print(f"{'payload':<16}{'dash ms':>10}{'fast ms':>10}{'speedup':>9}{'KiB':>9}")
+    for name, value in payloads(options.points):
+        standard_ms = measure(encode.standard_dumps, value, options.number)
+        encoders = [(name, encode.dumps)]
+        if name.endswith('numpy'):
+            encoders.append((name + '-b64', binary_dumps))
+        for label, dumps in encoders:
+            fast_ms = measure(dumps, value, options.number)
+            size = len(dumps(value)) / 1024
+            print(f"{label:<16}{standard_ms:>10.2f}{fast_ms:>10.2f}{standard_ms / fast_ms:>8.1f}x{size:>9.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,58 +1,499 @@
 import dash
+import json
+import flask
+import plotly
+import asyncio
+import inspect
+import warnings
+import threading
+import contextvars
+import tempfile
+from concurrent.futures import Future
+from time import perf_counter, monotonic
 from functools import wraps, partial
 from types import MethodType
 from collections.abc import Iterable
-from dash.dependencies import Output, Input, State
+from dash.dependencies import Output, Input, State, ALL, ALLSMALLER, _Wildcard
 from dash.exceptions import PreventUpdate
+from dash._utils import stringify_id
+from .cache import callback_cache, memory_cache, file_cache, request_key, single_flight
+from .instrument import callback_instrument, latency_aggregator, prometheus_text
+from .profile import callback_profiler
+from .dicts import pattern_key, pattern_view, callback_dict, indexed_callback_dict, lazy_callback_dict, \
+    callback_column, materialize
+from .parallel import merge_results, merge_outputs, shared_executor, parallel_runner
+from .background import background_cancelled, progress_reporter, background_job, background_manager
+from .sequence import current_request, session_id, request_scope, request_sequence
+from .rate_limit import rate_limiter
+from .deadline import current_deadline, callback_timeout, fallback_dict, with_deadline, callback_deadline
+from . import clientside, encode
+
+__all__ = ['DashDictCallbackPlugin', 'DashCallbackPlugin', 'dictionary', 'callback_cache', 'memory_cache', 'file_cache',
+           'request_key', 'callback_instrument', 'callback_profiler']
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class _DashDictCallbackPlugin():
-    class callback_dict(dict):
-        """
-        This class is a convenience class to work with dict_callback. It extends the
-        builtin dict class by adding three methods that can be used to more easily
-        interact with pattern matching component ids.
+    # The machinery living in the modules of the package, kept as attributes of the plugin.
+    # The dictionaries handed to the callbacks, see dicts.py
+    pattern_key = pattern_key
+    pattern_view = pattern_view
+    callback_dict = callback_dict
+    indexed_callback_dict = indexed_callback_dict
+    lazy_callback_dict = lazy_callback_dict
+    callback_column = callback_column
+    materialize = staticmethod(materialize)
+    # dict_callback(parallel=...), see parallel.py
+    merge_results = staticmethod(merge_results)
+    merge_outputs = staticmethod(merge_outputs)
+    executor = staticmethod(shared_executor)
+    parallel_runner = staticmethod(parallel_runner)
+    # dict_callback(background=...), see background.py
+    background_cancelled = background_cancelled
+    progress_reporter = progress_reporter
+    background_job = background_job
+    background_manager = background_manager
+    background_jobs = background_manager()
+    # dict_callback(supersede=...), see sequence.py. current_request tells the running dict
+    # callback whether it is still the latest request
+    current_request = current_request
+    session_id = staticmethod(session_id)
+    request_scope = staticmethod(request_scope)
+    request_sequence = request_sequence
+    # dict_callback(throttle=..., debounce=...), see rate_limit.py
+    rate_limiter = rate_limiter
+    # dict_callback(timeout=...), see deadline.py. current_deadline is the monotonic time at
+    # which the running dict callback times out
+    current_deadline = current_deadline
+    callback_timeout = callback_timeout
+    fallback_dict = fallback_dict
+    with_deadline = staticmethod(with_deadline)
+    callback_deadline = callback_deadline
 
-        The private method _property_key_key converts an id/property dict to
-        our internal dict label. String id components have their property are
-        mapped to 'id.property' while pattern matched id's are flattened using
-        frozenset which guarantees the id dict will map to the same immutable object
-        regardless of the order of the keys. We use the hashable tuple
-        (frozenset, property) as the key. This mapping is centralize here.
+    class key_plan():
+        """
+        A key plan is the precompiled layout of the keys of a callback_dict for one
+        list of dependencies (the outputs, inputs or states of a callback). It is built
+        once when the callback is decorated so the per request work is reduced to
+        zipping the values Dash passes in onto keys that already exist.
 
-        The method pget is intended to be used with pattern matched components
-        but can be used with string id components. It can be accessed in two ways
-        the id can be supplied with the property or as long as there isn't a name
-        collision with the named parameters, the id components can be supplied by
-        themselves. For example, input.pget({type: 'btn', index: 1}, 'n_clicks')
-        or input.pget(type='btn', index=1, property='n_clicks') can be used.
+        Dependencies with a string id, or a dict id without wildcards, always map to
+        the same key and are stored directly in `keys`. Dependencies with MATCH, ALL
+        or ALLSMALLER wildcards depend on the concrete ids in the callback context and
+        are resolved on every call by a wildcard_slot. Their position in `keys` holds
+        None until resolved. ALL and ALLSMALLER slots resolve to a list of keys.
 
-        The method pset is also mainly a pattern matched component convenience.
-        It sets a value in the dictionary. And has two modes of operation similar to pget.
+        For 'strict' validation the static keys are frozen into `allowed` once, so
+        checking an output dictionary is a subset test. Only when that fails are the
+        resolved wildcard keys consulted.
 
-<        Finally, pkeys unpacks all the pattern matched id/property into tuples of
-        ids and properties. But only lists the pattern matched component ids.
+        With 'columnar' the ALL and ALLSMALLER inputs and states are not resolved to
+        keys, they keep the key of their declared id and their values are wrapped in
+        a callback_column. These are listed in `columns`.
         """
 
+        class wildcard_slot():
+            """
+            Resolves the concrete ids of a wildcard dependency to keys. Since every
+            concrete id shares the static part of the declared id, only the values of
+            the wildcard fields are needed to tell ids apart. These are used to cache
+            the keys already built so each id is only converted once.
+            """
+
+            # Bound on the number of ids remembered, dynamic layouts can generate
+            # an unbounded number of indices over the lifetime of a server.
+            cache_limit = 65536
+
+            def __init__(self, property, fields, multi):
+                self.property = property
+                self.fields = fields
+                self.multi = multi
+                self.cache = {}
+                # With a single wildcard field, by far the most common case, its value
+                # is used directly as the signature rather than a tuple of values
+                self.field = fields[0] if fields and len(fields) == 1 else None
+
+            def key(self, prop):
+                if self.fields is None:
+                    return _DashDictCallbackPlugin.callback_dict._property_to_key(prop)
+                id_ = prop['id']
+                if self.field is not None:
+                    signature = id_[self.field]
+                else:
+                    signature = tuple([id_[field] for field in self.fields])
+                try:
+                    return self.cache[signature]
+                except KeyError:
+                    pass
+                if len(self.cache) >= self.cache_limit:
+                    self.cache.clear()
+                key = self.cache[signature] = _DashDictCallbackPlugin.pattern_key(id_, self.property)
+                return key
+
+            def resolve(self, entry):
+                if not self.multi:
+                    return self.key(entry)
+                if self.field is not None:
+                    # Fast path when every id has been seen before
+                    cache = self.cache
+                    field = self.field
+                    try:
+                        return [cache[prop['id'][field]] for prop in entry]
+                    except KeyError:
+                        pass
+                return [self.key(prop) for prop in entry]
+
+        def __init__(self, keys, dynamic, single=False, columns=(), as_array=False):
+            self.keys = keys
+            self.dynamic = dynamic
+            # A single non list output, the value must be unwrapped from our list
+            self.single = single
+            self.columns = list(columns)
+            self.as_array = as_array
+            # Whether the properties in the callback context are needed to build a dict
+            self.contextual = bool(dynamic or columns)
+            self.allowed = frozenset(key for key in keys if key is not None)
+            # The position in the value list of each static key, columns need wrapping first
+            self.positions = {key: index for index, key in enumerate(keys) if key is not None}
+            for index in self.columns:
+                del self.positions[keys[index]]
+
+        @classmethod
+        def from_dependencies(cls, dependencies, columnar=False):
+            """
+            Compiles a plan from the declared Output, Input or State objects. columnar
+            is True or 'numpy' to deliver ALL and ALLSMALLER dependencies as columns.
+            """
+            keys = []
+            dynamic = []
+            columns = []
+            for dep in dependencies:
+                id_ = dep.component_id
+                fields = None
+                if isinstance(id_, dict):
+                    fields = tuple(sorted(k for k, v in id_.items() if isinstance(v, _Wildcard)))
+                if fields:
+                    multi = any(id_[field] in (ALL, ALLSMALLER) for field in fields)
+                    if multi and columnar:
+                        columns.append(len(keys))
+                        keys.append(_DashDictCallbackPlugin.pattern_key(id_, dep.component_property))
+                        continue
+                    dynamic.append((len(keys), cls.wildcard_slot(dep.component_property, fields, multi)))
+                    keys.append(None)
+                else:
+                    keys.append(_DashDictCallbackPlugin.callback_dict._property_to_key(
+                        dict(id=id_, property=dep.component_property)))
+            return cls(keys, dynamic, columns=columns, as_array=columnar == 'numpy')
+
         @classmethod
-        def _property_to_key(cls, prop):
-            """Converts the property to our key format for dictionaries"""
-            if type(prop['id']) == dict:
-                return (frozenset(prop['id'].items()), prop['property'])
+        def from_context(cls, prop_list):
+            """
+            Compiles a plan from a list of properties in the callback context. This is
+            used when the declared dependencies are not known. Dict ids are always
+            resolved per call since we can't tell which fields are wildcards.
+            """
+            single = not isinstance(prop_list, (list, tuple))
+            if single:
+                prop_list = [prop_list]
+            keys = []
+            dynamic = []
+            for prop in prop_list:
+                if isinstance(prop, (list, tuple)) or isinstance(prop['id'], dict):
+                    multi = isinstance(prop, (list, tuple))
+                    dynamic.append((len(keys), cls.wildcard_slot(None, None, multi)))
+                    keys.append(None)
+                else:
+                    keys.append(_DashDictCallbackPlugin.callback_dict._property_to_key(prop))
+            return cls(keys, dynamic, single)
+
+        def resolve(self, prop_list):
+            """Returns the keys with the wildcard slots resolved against prop_list"""
+            if not self.dynamic:
+                return self.keys
+            if not isinstance(prop_list, (list, tuple)):
+                prop_list = [prop_list]
+            keys = list(self.keys)
+            for index, slot in self.dynamic:
+                keys[index] = slot.resolve(prop_list[index])
+            return keys
+
+        def to_dict(self, values, prop_list):
+            """Maps a list of values onto a callback_dict"""
+            if len(values) != len(self.keys):
+                raise ValueError("List must have the same number of elements as keys")
+            if not self.dynamic and not self.columns:
+                return _DashDictCallbackPlugin.callback_dict(zip(self.keys, values))
+            return self.fill(_DashDictCallbackPlugin.callback_dict(), values, prop_list)
+
+        def column(self, index, values, prop_list):
+            """Wraps the values of the column at index with the ids in prop_list"""
+            values = numpy.asarray(values) if self.as_array else values
+            return _DashDictCallbackPlugin.callback_column([prop['id'] for prop in prop_list[index]], values)
+
+        def to_lazy_dict(self, values, prop_list):
+            """Maps a list of values onto a lazy_callback_dict"""
+            if len(values) != len(self.keys):
+                raise ValueError("List must have the same number of elements as keys")
+            return _DashDictCallbackPlugin.lazy_callback_dict(self, values, prop_list)
+
+        def fill(self, out_dict, values, prop_list):
+            """Fills out_dict with the values, bypassing any overridden dict methods"""
+            for key, value in zip(self.resolve(prop_list), values):
+                if type(key) is list:
+                    if len(key) != len(value):
+                        raise ValueError("List must have the same number of elements as keys")
+                    dict.update(out_dict, zip(key, value))
+                else:
+                    dict.__setitem__(out_dict, key, value)
+            for index in self.columns:
+                dict.__setitem__(out_dict, self.keys[index], self.column(index, values[index], prop_list))
+            return out_dict
+
+        def from_dict(self, output_values, keys, allow_missing):
+            """
+            Maps an output dict to a list of values using the keys returned by resolve.
+            ALL outputs produce a nested list. Missing keys become no_update if
+            allow_missing otherwise a KeyError is raised.
+            """
+            if allow_missing:
+                get = output_values.get
+                no_update = dash.no_update
+                return [[get(k, no_update) for k in key] if type(key) is list else get(key, no_update)
+                        for key in keys]
+            return [[output_values[k] for k in key] if type(key) is list else output_values[key]
+                    for key in keys]
+
+        def excess_keys(self, output_values, keys):
+            """Returns the keys of output_values not in the keys returned by resolve"""
+            output_keys = output_values.keys()
+            if output_keys <= self.allowed:
+                return ()
+            excess = output_keys - self.allowed
+            for index, _ in self.dynamic:
+                key = keys[index]
+                if type(key) is list:
+                    excess.difference_update(key)
+                else:
+                    excess.discard(key)
+            return excess
+
+    class trigger_index():
+        """
+        Maps the prop_id strings of ctx.triggered to the handlers, numbered in the
+        order they were given, having the triggered property among their inputs.
+        The prop_id of inputs without wildcards is known ahead of time and looked up
+        directly. Otherwise the id is parsed and compared to the wildcard inputs,
+        the result is cached by prop_id.
+        """
+
+        # Bound on the number of wildcard prop_ids remembered
+        cache_limit = 4096
+
+        def __init__(self, handler_inputs):
+            self.static = {}
+            self.wildcards = []
+            self.cache = {}
+            for handler, inputs in enumerate(handler_inputs):
+                for dep in inputs:
+                    id_ = dep.component_id
+                    if isinstance(id_, dict) and any(isinstance(v, _Wildcard) for v in id_.values()):
+                        fixed = {k: v for k, v in id_.items() if not isinstance(v, _Wildcard)}
+                        self.wildcards.append((dep.component_property, fixed, frozenset(id_), handler))
+                    else:
+                        # str of a dependency is the prop_id Dash uses in ctx.triggered
+                        self.static.setdefault(str(dep), set()).add(handler)
+
+        def _match(self, prop_id):
+            try:
+                return self.cache[prop_id]
+            except KeyError:
+                pass
+            handlers = set()
+            id_str, _, property = prop_id.rpartition('.')
+            if self.wildcards and id_str.startswith('{'):
+                try:
+                    id_ = json.loads(id_str)
+                except ValueError:
+                    id_ = None
+                if isinstance(id_, dict):
+                    for wild_property, fixed, fields, handler in self.wildcards:
+                        if (wild_property == property and fields == id_.keys()
+                                and all(id_[k] == v for k, v in fixed.items())):
+                            handlers.add(handler)
+            if len(self.cache) >= self.cache_limit:
+                self.cache.clear()
+            handlers = self.cache[prop_id] = frozenset(handlers)
+            return handlers
+
+        def handlers(self, triggered):
+            """Returns the set of handlers triggered by the ctx.triggered list"""
+            found = set()
+            for trigger in triggered:
+                prop_id = trigger['prop_id']
+                handlers = self.static.get(prop_id)
+                found.update(self._match(prop_id) if handlers is None else handlers)
+            return found
+
+    class callback_group():
+        """
+        The functions decorated with dict_callback(group=name) on an app. They are
+        registered as a single Dash callback over the union of their dependencies, so
+        they can share outputs. Each time a function joins the group the merged
+        callback is registered again in place of the previous one.
+        """
+
+        def __init__(self, name):
+            self.name = name
+            self.members = []
+            self.callback_id = None
+
+        def add(self, func, dependencies, strict, prevent_initial_call, options):
+            self.members.append(dict(func=func, dependencies=dependencies, strict=strict,
+                                     prevent_initial_call=prevent_initial_call, options=options))
+
+        def dependencies(self):
+            """The union of the outputs, inputs and states of the members without duplicates"""
+            union = ([], [], [])
+            seen = (set(), set(), set())
+            for member in self.members:
+                for deps, merged, names in zip(member['dependencies'], union, seen):
+                    for dep in deps:
+                        if str(dep) not in names:
+                            names.add(str(dep))
+                            merged.append(dep)
+            return union
+
+        def dispatcher(self):
+            """
+            Returns a dict callback running the members whose inputs triggered, or
+            on the initial call the members not preventing it, and merging their
+            output dictionaries in the order they joined the group.
+            """
+            members = list(self.members)
+            index = _DashDictCallbackPlugin.trigger_index([member['dependencies'][1] for member in members])
+            initial = {number for number, member in enumerate(members) if not member['prevent_initial_call']}
+
+            def dispatch(inputs, states):
+                triggered = dash.callback_context.triggered
+                handlers = index.handlers(triggered) if triggered else initial
+                return _DashDictCallbackPlugin.merge_outputs(
+                    [members[number]['func'] for number in sorted(handlers)], inputs, states)
+
+            dispatch.__name__ = dispatch.__qualname__ = f"dict_callback_group_{self.name}"
+            return dispatch
+
+    # Event loop running the async dict callbacks, started on first use
+    loop = None
+    loop_lock = threading.Lock()
+
+    def event_loop(self):
+        """Returns the shared event loop, running in a daemon thread"""
+        with self.loop_lock:
+            if self.loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='dict-callback-loop', daemon=True).start()
+                _DashDictCallbackPlugin.loop = loop
+            return self.loop
+
+    def run_coroutine(self, coro):
+        """
+        Runs coro on the shared event loop and waits for its result. The coroutine
+        runs in a copy of the current context so the callback context is available.
+        """
+        loop = self.event_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coro.close()
+            raise RuntimeError('An async dict callback can\'t be waited for from the shared event loop')
+        future = Future()
+
+        def done(task):
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
             else:
-                return f"{prop['id']}.{prop['property']}"
+                future.set_result(task.result())
+
+        def schedule():
+            # The task copies the current context, i.e. the one of the request
+            asyncio.ensure_future(coro).add_done_callback(done)
+
+        loop.call_soon_threadsafe(contextvars.copy_context().run, schedule)
+        return future.result()
+
+    def synchronous(self, func):
+        """Returns func, or if it is an async function a function running it on the shared event loop"""
+        if not inspect.iscoroutinefunction(func):
+            return func
+
+        @wraps(func)
+        def run(inputs, states, **kwargs):
+            return self.run_coroutine(func(inputs, states, **kwargs))
+        return run
+
+    @staticmethod
+    def handler_input(key):
+        """Converts a handlers key, 'id.property', a pattern key or an Input, to an Input"""
+        if isinstance(key, (Input, State)):
+            return key
+        if isinstance(key, tuple):
+            return Input(dict(key[0]), key[1])
+        id_, _, property = key.rpartition('.')
+        return Input(id_, property)
+
+    def handler_dispatcher(self, handlers, func, inputs=None):
+        """
+        Returns a dict callback running the handlers whose key triggered the callback
+        and merging their outputs. func is run when no handler was triggered, e.g. on
+        the initial call. If the inputs of the callback are given, the keys are checked
+        against them.
+        """
+        keys = [self.handler_input(key) for key in handlers]
+        if inputs is not None:
+            unknown = [str(key) for key in keys if not any(key == dep for dep in inputs)]
+            if unknown:
+                raise KeyError(f'The following handler keys are not inputs {",".join(unknown)}')
+        funcs = list(handlers.values())
+        index = self.trigger_index([[key] for key in keys])
 
-        def pget(self, id_=None, property=None, **kwargs):
-            if not id_:
-                id_ = kwargs
-            return self[self._property_to_key(dict(id=id_, property=property))]
+        def dispatch(inputs, states):
+            triggered = dash.callback_context.triggered
+            numbers = index.handlers(triggered) if triggered else ()
+            if not numbers:
+                return func(inputs, states)
+            # A function can handle several keys but only runs once
+            matched = []
+            for number in sorted(numbers):
+                if funcs[number] not in matched:
+                    matched.append(funcs[number])
+            return self.merge_outputs(matched, inputs, states)
 
-        def pset(self, key=None, property=None, value=None, **kwargs):
-            if not key:
-                key = kwargs
-            self[self._property_to_key(dict(id=key, property=property))] = value
+        return wraps(func)(dispatch)
 
-        def pkeys(self):
-            return [(dict(k[0]), k[1]) for k in self.keys() if isinstance(k, tuple)]
+    @classmethod
+    def superseded(cls):
+        """True if the session made a newer request of the running dict callback"""
+        is_latest = cls.current_request.get()
+        return is_latest is not None and not is_latest()
+
+    @classmethod
+    def remaining(cls):
+        """The seconds left before the running dict callback times out, None without a timeout"""
+        deadline = cls.current_deadline.get()
+        return None if deadline is None else max(0.0, deadline - monotonic())
+
+    @classmethod
+    def checkpoint(cls):
+        """Raises PreventUpdate if the running dict callback was superseded or timed out"""
+        if cls.superseded() or cls.remaining() == 0.0:
+            raise PreventUpdate
 
     def dict_callback(self, app, *_args, **_kwargs):
         """
@@ -83,86 +524,572 @@ class _DashDictCallbackPlugin():
         The 'allow_missing' argument returns a 'no_update'. For any keys missing when
         in the output returned by the callback. If 'False' a KeyError is raised if
         any keys are missing in the output dictionary. Defaults to 'True'.
+
+        The 'lazy' argument passes the inputs and states as lazy_callback_dict which
+        only build their entries when they are needed. This saves work for callbacks
+        with many inputs or states of which only a few are read. Defaults to 'False'.
+
+        The 'diff_outputs' argument replaces an output value by a 'no_update' when it
+        is the same as the value of the Input or State with the same id and property,
+        i.e. the value the browser already has. The Input and State values are
+        fingerprinted before the callback runs so values changed in place are still
+        sent. Defaults to 'False'.
+
+        The 'group' argument lets several functions share outputs, which Dash doesn't
+        allow for separate callbacks. All the functions decorated with the same group
+        name are registered as one callback over the union of their dependencies. When
+        it fires, only the functions whose inputs triggered are run (all of them, except
+        those with 'prevent_initial_call', on the initial call) and their output
+        dictionaries are merged, later functions overriding earlier ones. Missing
+        outputs are always allowed, 'strict' is checked against all the outputs of the
+        group and the 'lazy' and 'diff_outputs' options apply if any member sets them.
+        'cache' is not supported with groups. Defaults to 'None'.
+
+        The 'handlers' argument maps input keys, in the 'id.property' or pattern key
+        format (wildcards allowed), to functions taking the inputs and states and
+        returning part of the output dictionary. Only the handlers of the triggered
+        inputs are run and their outputs are merged. The decorated function is run
+        instead when no handler was triggered, such as on the initial call. 'cache'
+        can't be combined with handlers. Defaults to 'None'.
+
+        The 'parallel' argument is a list of functions taking the inputs and states and
+        returning part of the output dictionary. They are run concurrently with the
+        decorated function and their outputs are merged. The 'executor' argument
+        selects a shared 'thread' pool (the default, suited to I/O bound functions), a
+        'process' pool (CPU bound functions, which must be picklable and can't use the
+        callback context, the decorated function itself runs in the request worker)
+        or any concurrent.futures Executor. The 'conflicts'
+        argument decides what happens when functions return the same key, 'error'
+        (the default) raises a KeyError, 'first' or 'last' keeps the value of the first
+        or last function, the decorated function being first. Defaults to 'None'.
+
+        The decorated function, as well as the 'parallel' and 'handlers' functions, can
+        be an 'async def' function. It is run on an event loop shared by all the dict
+        callbacks, so it can await several backends at once, e.g. with asyncio.gather.
+
+        The 'background' argument runs the decorated function as a job on the
+        'executor' instead of the request worker. It then needs the ids of a disabled
+        dcc.Interval, 'poll', and of a dcc.Store, 'job', in the layout. The callback
+        starts the job and enables the interval, which collects the outputs reported so
+        far on each tick. The function receives a 'progress' keyword argument to call
+        with partial output dictionaries, whose keys can be outputs of the callback or
+        the extra 'progress' output keys. The 'cancel' argument is an input key,
+        e.g. 'cancel-button.n_clicks', cancelling the running job. A new request
+        cancels the job still running for the same browser. Missing outputs are
+        always allowed. Defaults to 'False'.
+
+        The 'fast_json' argument encodes the response with orjson when it is
+        installed, which also handles NumPy arrays and datetimes natively, and the
+        standard json module otherwise. NumPy arrays and pandas columns can then be
+        returned as output values without converting them to lists, they are encoded
+        from their buffer. The 'binary_arrays' argument, which implies 'fast_json',
+        sends the numeric arrays of the traces of 'figure' outputs as base64 typed
+        arrays instead. Only plotly.js 2.28 or later decodes them, a warning is
+        raised at registration when dash_core_components bundles an older one.
+        Both default to 'False'.
+
+        The 'columnar' argument delivers each ALL or ALLSMALLER input or state as one
+        callback_column entry, under the key of its declared id, instead of one entry
+        per concrete id. The column holds the ids and a list of the values, or with
+        'numpy' a NumPy array, so callbacks can work on the values as a whole.
+        Defaults to 'False'.
+
+        The 'payload_budget' argument measures the serialized size of each output. It
+        can be 'True' to only measure, a number of bytes for every output or a
+        dictionary of budgets by output key. Outputs over their budget are reported by
+        key with a payload_warning, or a payload_too_large error if 'on_budget' is
+        'raise'. The sizes seen so far are available as the 'payload' attribute of the
+        decorated function. Defaults to 'None'.
+
+        The 'profile' argument profiles one in every 'profile' calls of the callback,
+        see DashDictCallbackPlugin.profiler which can also switch profiling on and off
+        at runtime. The profiles are kept in a directory of the app and listed at
+        /_dict-callback/profiles when serve_profiles is set. Defaults to 'None'.
+
+        The 'cache' argument memoizes a callback that is a pure function of its inputs
+        and states. It can be 'True' for an in-process LRU cache or any callback_cache
+        such as a memory_cache or file_cache with a size limit and time to live. The
+        cache is keyed on the canonicalized input and state dictionaries and stores
+        the output dictionary. The cache and its hit/miss stats are available as the
+        'cache' attribute of the decorated function. Defaults to 'None'.
+
+        The 'coalesce' argument makes concurrent calls with the same inputs and states
+        wait for a single execution of the callback and share its output dictionary
+        (or exception). With 'True' only the calls of the same session share an
+        execution, see 'session'. With 'global' the calls of every user do, e.g. the
+        initial calls of many users loading the same page, the callback must then not
+        depend on the user or the session. With a cache the output is also stored
+        once. The executed and shared call counts are available as the 'coalesce'
+        attribute of the decorated function. Defaults to 'False'.
+
+        The 'supersede' argument numbers the requests of the callback per session, and
+        per matched outputs for MATCH callbacks. When a newer request arrives, e.g. the
+        next keystroke, the older ones still running raise PreventUpdate rather than
+        send stale outputs. The callback can call DashDictCallbackPlugin.checkpoint()
+        to stop as soon as it was superseded. It can be 'True', using the flask session
+        which needs a secret key on the server, or a function returning the session of
+        the current request, e.g. from an authenticated user. The sequences are kept in
+        the process, and the superseded count is available as the 'supersede' attribute
+        of the decorated function. Defaults to 'False'.
+
+        The 'throttle' and 'debounce' arguments, in seconds, limit how often the callback
+        runs for a session whatever the browser sends. With 'throttle' the callback runs
+        at most once per interval, a request arriving sooner returns right away with no
+        update, or the last output dictionary of the session with 'on_throttle' set to
+        'last'. The last value of a burst can then be dropped. With 'debounce' a
+        request waits that long and only runs if no newer request arrived meanwhile,
+        so the last value is always handled, the waiting requests hold a worker
+        thread but no CPU. The suppressed counts are available as the 'rate_limit'
+        attribute of the decorated function. Both default to 'None'.
+
+        The 'session' argument is a function returning the session of the current
+        request for 'coalesce', 'supersede', 'throttle' and 'debounce', e.g. the
+        authenticated user. It defaults to the 'supersede' function if one is given, otherwise to a
+        random id kept in the flask session, which needs a secret key on the server.
+
+        The 'timeout' argument, in seconds, runs the callback on a thread pool of its
+        own, never on the shared pools, and waits at most that long for it. A Python
+        function can't be stopped from the outside, so a timed out callback finishes
+        in the background. It can read the seconds left with
+        DashDictCallbackPlugin.remaining() to degrade gracefully, and
+        DashDictCallbackPlugin.checkpoint() raises PreventUpdate once the time is up.
+        'on_timeout' decides what is sent instead: 'no_update', 'raise' for a
+        callback_timeout error, 'last' for the last output dictionary the callback
+        returned for the same inputs and states, an output dictionary, or a function
+        of the inputs and states returning one. Fallback outputs are never cached.
+        The call and timeout counts are available as the 'deadline' attribute of the
+        decorated function. Defaults to 'None'.
         """
 
         # Pull new options out of the keyword arguments
         strict = _kwargs.pop('strict', False)
         allow_missing = _kwargs.pop('allow_missing', True)
         prevent_initial_call = _kwargs.pop('prevent_initial_call', None)
+        # Options only handled by dictionaryize
+        options = dict(lazy=_kwargs.pop('lazy', False),
+                       diff_outputs=_kwargs.pop('diff_outputs', False),
+                       cache=_kwargs.pop('cache', None),
+                       handlers=_kwargs.pop('handlers', None),
+                       parallel=_kwargs.pop('parallel', None),
+                       executor=_kwargs.pop('executor', 'thread'),
+                       conflicts=_kwargs.pop('conflicts', 'error'),
+                       profile=_kwargs.pop('profile', None),
+                       payload_budget=_kwargs.pop('payload_budget', None),
+                       on_budget=_kwargs.pop('on_budget', 'warn'),
+                       fast_json=_kwargs.pop('fast_json', False),
+                       binary_arrays=_kwargs.pop('binary_arrays', False),
+                       columnar=_kwargs.pop('columnar', False),
+                       coalesce=_kwargs.pop('coalesce', False),
+                       supersede=_kwargs.pop('supersede', False),
+                       throttle=_kwargs.pop('throttle', None),
+                       debounce=_kwargs.pop('debounce', None),
+                       on_throttle=_kwargs.pop('on_throttle', 'no_update'),
+                       timeout=_kwargs.pop('timeout', None),
+                       on_timeout=_kwargs.pop('on_timeout', 'no_update'),
+                       session=_kwargs.pop('session', None))
+        sessions = options['supersede'] is True or options['coalesce'] is True or (
+            not callable(options['supersede']) and (options['throttle'] is not None or options['debounce'] is not None))
+        if sessions and options['session'] is None and app.server is not None and not app.server.secret_key:
+            raise ValueError("The 'coalesce', 'supersede', 'throttle' and 'debounce' options need a secret_key on "
+                             "the server to keep the sessions, or a 'session' function returning the session of "
+                             "the request")
+        group = _kwargs.pop('group', None)
+        background = dict(poll=_kwargs.pop('poll', None), job=_kwargs.pop('job', None),
+                          progress=_kwargs.pop('progress', ()), cancel=_kwargs.pop('cancel', None))
         _args=self.normalize(_args)
-        
-        return partial(self.decorator, app, allow_missing, strict, prevent_initial_call, _args, _kwargs)
 
-    def decorator(self, app, allow_missing, strict, pic, _args, _kwargs, func):
-        return app.callback(*_args, prevent_initial_call=pic, **_kwargs)(self.dictionaryize(allow_missing, strict, func))
+        if _kwargs.pop('background', False):
+            if group is not None or options['coalesce'] or options['supersede'] or \
+                    any(options[name] is not None
+                        for name in ('cache', 'handlers', 'parallel', 'profile', 'throttle', 'debounce', 'timeout')):
+                raise ValueError("The 'group', 'cache', 'coalesce', 'supersede', 'throttle', 'debounce', "
+                                 "'timeout', 'handlers', 'parallel' and 'profile' options are not supported for a "
+                                 "background dict_callback")
+            if background['poll'] is None or background['job'] is None:
+                raise ValueError("A background dict_callback needs the ids of a 'poll' Interval and a 'job' Store")
+            return partial(self.background_decorator, app, strict, prevent_initial_call, _args, _kwargs, options,
+                           background)
+
+        if group is not None:
+            if options['cache'] is not None:
+                raise ValueError("The 'cache' option is not supported for a dict_callback group")
+            if options['handlers'] is not None:
+                raise ValueError("The 'handlers' option is not supported for a dict_callback group")
+            if options['parallel'] is not None:
+                raise ValueError("The 'parallel' option is not supported for a dict_callback group")
+            if options['payload_budget'] is not None:
+                raise ValueError("The 'payload_budget' option is not supported for a dict_callback group")
+            if options['columnar']:
+                raise ValueError("The 'columnar' option is not supported for a dict_callback group")
+            if options['coalesce']:
+                raise ValueError("The 'coalesce' option is not supported for a dict_callback group")
+            if options['supersede']:
+                raise ValueError("The 'supersede' option is not supported for a dict_callback group")
+            if options['throttle'] is not None or options['debounce'] is not None:
+                raise ValueError("The 'throttle' and 'debounce' options are not supported for a dict_callback group")
+            if options['timeout'] is not None:
+                raise ValueError("The 'timeout' option is not supported for a dict_callback group")
+            return partial(self.group_decorator, app, group, strict, prevent_initial_call, _args, _kwargs, options)
+        return partial(self.decorator, app, allow_missing, strict, prevent_initial_call, _args, _kwargs, options)
 
-    def dictionaryize(self, allow_missing, strict, func):
+    def dict_clientside_callback(self, app, clientside_function, *_args, **_kwargs):
+        """
+        The clientside counterpart of `app.dict_callback`, the dict function runs in
+        the browser so the callback needs no round trip to the server. It is given
+        as the source of a JavaScript function or as a ClientsideFunction of an
+        asset, and is called with the `inputs` and `states` objects. The keys are of
+        the form "id.property", pattern matched ids are serialized as Dash does in
+        the prop ids, with sorted fields, e.g. '{"index":1,"type":"row"}.value'. It
+        returns an object keyed the same way, or `dash_clientside.no_update`.
+
+            app.dict_clientside_callback(
+                '''
+                function (inputs, states) {
+                    return {'fahrenheit.value': inputs['celsius.value'] * 9 / 5 + 32};
+                }
+                ''',
+                Output('fahrenheit', 'value'), Input('celsius', 'value'))
+
+        The 'strict', 'allow_missing' and 'prevent_initial_call' arguments behave as
+        for `app.dict_callback`, the errors are thrown in the browser. MATCH outputs
+        are supported, ALL outputs are not since the browser doesn't pass their ids.
+        """
+        strict = _kwargs.pop('strict', False)
+        allow_missing = _kwargs.pop('allow_missing', True)
+        outputs, inputs, states = self.normalize(_args)
+        source = clientside.wrapper(clientside_function, outputs, inputs, states, strict, allow_missing)
+        if clientside.RUNTIME not in app._inline_scripts:
+            app._inline_scripts.append(clientside.RUNTIME)
+        app.clientside_callback(source, outputs, inputs, states, **_kwargs)
+
+    def decorator(self, app, allow_missing, strict, pic, _args, _kwargs, options, func):
+        options = dict(options)
+        fast_json, binary_arrays = options.pop('fast_json'), options.pop('binary_arrays')
+        registered = app.callback(*_args, prevent_initial_call=pic, **_kwargs)(
+            self.dictionaryize(allow_missing, strict, func, dependencies=_args, **options))
+        if fast_json or binary_arrays:
+            return self.fast_json_context(app, app._callback_list[-1]['output'], binary_arrays)
+        return registered
+
+    def fast_json_context(self, app, callback_id, binary_arrays=False):
+        """
+        Replaces the function Dash calls for callback_id by one encoding the response
+        with encode.dumps rather than the standard json module. The dict callback
+        already returns a value shaped like the outputs, so Dash's validation of the
+        returned value is not repeated. With binary_arrays the 'figure' outputs go
+        through encode.binary_figure.
+        """
+        if binary_arrays:
+            version = encode.plotlyjs_version()
+            if version is not None and version < (2, 28):
+                warnings.warn(f"binary_arrays needs plotly.js 2.28 or later to decode the figures of {callback_id}, "
+                              f"dash_core_components bundles plotly.js {'.'.join(map(str, version))}")
+        func = app.callback_map[callback_id]['callback'].__wrapped__
+        multi = callback_id.startswith('..')
+        no_update = type(dash.no_update)
+
+        @wraps(func)
+        def add_context(*args, outputs_list, **kwargs):
+            output_value = func(*args, **kwargs)  # %% callback invoked %%
+            if isinstance(output_value, no_update):
+                raise PreventUpdate
+            if not multi:
+                output_value, outputs_list = [output_value], [outputs_list]
+
+            component_ids = {}
+            for value, spec in zip(output_value, outputs_list):
+                if isinstance(value, no_update):
+                    continue
+                for vali, speci in (zip(value, spec) if isinstance(spec, list) else ((value, spec),)):
+                    if not isinstance(vali, no_update):
+                        if binary_arrays and speci['property'] == 'figure':
+                            vali = encode.binary_figure(vali)
+                        component_ids.setdefault(stringify_id(speci['id']), {})[speci['property']] = vali
+            if not component_ids:
+                raise PreventUpdate
+            return encode.dumps({'response': component_ids, 'multi': True})
+
+        app.callback_map[callback_id]['callback'] = add_context
+        return add_context
+
+    def group_decorator(self, app, name, strict, pic, _args, _kwargs, options, func):
+        groups = app.__dict__.setdefault('_dict_callback_groups', {})
+        group = groups.get(name)
+        if group is None:
+            group = groups[name] = self.callback_group(name)
+        # An unset prevent_initial_call takes the app default, so one explicit False isn't lost
+        if pic is None:
+            pic = app.config.prevent_initial_callbacks
+        group.add(self.synchronous(func), _args, strict, pic, options)
+
+        # Replace the previous registration of the group by one including func
+        if group.callback_id is not None:
+            app.callback_map.pop(group.callback_id, None)
+            app._callback_list[:] = [spec for spec in app._callback_list if spec['output'] != group.callback_id]
+        members = group.members
+        # The initial call is prevented only when no member runs on it
+        pic = all(member['prevent_initial_call'] for member in members)
+        group_strict = any(member['strict'] for member in members)
+        group_options = dict(lazy=any(member['options']['lazy'] for member in members),
+                             diff_outputs=any(member['options']['diff_outputs'] for member in members),
+                             profile=min((member['options']['profile'] for member in members
+                                          if member['options']['profile']), default=None))
+        dependencies = group.dependencies()
+        app.callback(*dependencies, prevent_initial_call=pic, **_kwargs)(
+            self.dictionaryize(True, group_strict, group.dispatcher(), dependencies=dependencies, **group_options))
+        group.callback_id = app._callback_list[-1]['output']
+        binary_arrays = any(member['options']['binary_arrays'] for member in members)
+        if binary_arrays or any(member['options']['fast_json'] for member in members):
+            self.fast_json_context(app, group.callback_id, binary_arrays)
+        return func
+
+    def background_decorator(self, app, strict, pic, _args, _kwargs, options, background, func):
+        outputs, inputs, states = _args
+        poll, job = background['poll'], background['job']
+        progress = background['progress']
+        progress = [progress] if isinstance(progress, str) else list(progress)
+        cancel = background['cancel'] and self.handler_input(background['cancel'])
+        # The poll interval runs while a job does and the job store holds the id of the job
+        poll_key, disabled_key, job_key = f'{poll}.n_intervals', f'{poll}.disabled', f'{job}.data'
+        internal = {poll_key, job_key, cancel and str(cancel)}
+        outputs = outputs + [Output(*key.rpartition('.')[::2]) for key in progress] + \
+            [Output(poll, 'disabled'), Output(job, 'data')]
+        inputs = inputs + [Input(poll, 'n_intervals')] + ([cancel] if cancel else [])
+        states = states + [State(job, 'data')]
+        func = self.synchronous(func)
+        executor = options['executor']
+        jobs = self.background_jobs
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        def dispatch(inputs, states):
+            triggered = {t['prop_id'] for t in dash.callback_context.triggered} - {'.'}
+            job_id = states.get(job_key)
+            if cancel and str(cancel) in triggered:
+                jobs.cancel(job_id)
+                return {disabled_key: True, job_key: None}
+            if triggered and triggered <= {poll_key}:
+                running = jobs.get(job_id)
+                if running is None:
+                    return {disabled_key: True}
+                output, done = running.collect()
+                if done:
+                    jobs.pop(job_id)
+                    output.update({disabled_key: True, job_key: None})
+                    # Logged once, raising would fail the poll and leave the interval running
+                    if running.error is not None:
+                        flask.current_app.logger.error(f'The background job of {name} failed',
+                                                       exc_info=running.error)
+                return output or dash.no_update
+            # A new request supersedes the job still running for this browser
+            jobs.cancel(job_id)
+            job_inputs = self.callback_dict((key, value) for key, value in inputs.items() if key not in internal)
+            job_states = self.callback_dict((key, value) for key, value in states.items() if key not in internal)
+            job_id = jobs.start(func, job_inputs, job_states, self.executor(executor))
+            return {disabled_key: False, job_key: job_id}
+
+        dispatch = wraps(func)(dispatch)
+        app.callback(outputs, inputs, states, prevent_initial_call=pic, **_kwargs)(
+            self.dictionaryize(True, strict, dispatch, dependencies=(outputs, inputs, states),
+                               lazy=options['lazy'], diff_outputs=options['diff_outputs'],
+                               payload_budget=options['payload_budget'], on_budget=options['on_budget'],
+                               columnar=options['columnar']))
+        if options['fast_json'] or options['binary_arrays']:
+            self.fast_json_context(app, app._callback_list[-1]['output'], options['binary_arrays'])
+        return func
+
+    def dictionaryize(self, allow_missing, strict, func, dependencies=None, lazy=False, diff_outputs=False,
+                      cache=None, handlers=None, parallel=None, executor='thread', conflicts='error', profile=None,
+                      payload_budget=None, on_budget='warn', columnar=False, coalesce=False, supersede=False,
+                      throttle=None, debounce=None, on_throttle='no_update', timeout=None, on_timeout='no_update',
+                      session=None):
+        """
+        Wraps func so that it is called with input and state dictionaries and its
+        output dictionary is converted back to the list Dash expects.
+
+        If the dependencies (a tuple of the output, input and state lists as returned
+        by normalize) are given, the key plans are compiled right away. Otherwise
+        they are compiled from the callback context on the first call. The remaining
+        keyword arguments are the options described in dict_callback.
+        """
 
         #
         # Helper Functions
         #
 
-        # property_to_key is defined in the callback_dict class. Rather than
-        # making two copies we refer to the original for maintainablility
-        property_to_key = self.callback_dict._property_to_key
+        fingerprint = self.fingerprint
 
-        def to_dict(in_, prop_list, recurse=True):
+        def fingerprint_sent(output_keys, *sources):
             """
-            Maps an values input list to a dict based on the list of properties.
-            We allow one level of recursion since pattern matching allows for a list of lists.
+            Fingerprints the values the browser sent for any of the output keys,
+            this is for 'diff_outputs'.
             """
-            if len(in_) != len(prop_list):
-                raise ValueError("List must have the same number of elements as keys")
-            out_dict = self.callback_dict()
-            for prop, value in zip(prop_list, in_):
-                if isinstance(prop, (list, tuple)) and recurse:
-                    out_dict.update(to_dict(value, prop, recurse=False))
-                else:
-                    out_dict[property_to_key(prop)] = value
-            return out_dict
+            fingerprints = {}
+            for key in output_keys:
+                for k in (key if type(key) is list else (key,)):
+                    for source in sources:
+                        if k in source:
+                            fingerprints[k] = fingerprint(source[k])
+                            break
+            return fingerprints
 
-        def get_keys_from_list(prop_list, recurse=True):
-            """
-            Converts a list of properties to a list of keys. This is for 'strict' validation.
-            We allow one level of recurse for pattern matching.
-            """
-            out_list = []
-            for prop in prop_list:
-                if isinstance(prop, (list, tuple)) and recurse:
-                    out_list += get_keys_from_list(prop_list, recurse=False)
-                else:
-                    out_list.append(property_to_key(prop))
-            return out_list
+        def drop_unchanged(output_value, output_keys, fingerprints):
+            """Replaces the output values matching the fingerprints with no_update"""
+            no_update = dash.no_update
 
-        def from_dict(output_values, prop_list, recurse=True):
+            def unchanged(key, value):
+                return (key in fingerprints and value is not no_update
+                        and fingerprints[key] is not None and fingerprint(value) == fingerprints[key])
+
+            for index, key in enumerate(output_keys):
+                if type(key) is list:
+                    output_value[index] = [no_update if unchanged(k, v) else v
+                                           for k, v in zip(key, output_value[index])]
+                elif unchanged(key, output_value[index]):
+                    output_value[index] = no_update
+
+        def check_payload(output_value, output_keys):
             """
-            Maps output_values dict to a list based on the list of properties. 
-            For symmetry sake, we allow one level of recursion, but pattern matching on outputs
-            doesn't support any kind of list of list. 
+            Records the serialized size of each output and warns or raises for the ones
+            over their budget, this is for 'payload_budget'.
             """
-            # A single property may appear not as a so we make it a list for consistent processing.
+            over = []
+            for key, value in zip(output_keys, output_value):
+                for k, v in (zip(key, value) if type(key) is list else ((key, value),)):
+                    if v is dash.no_update:
+                        continue
+                    size = self.serialized_size(v)
+                    if size is None:
+                        continue
+                    name = self.key_name(k)
+                    stats = payload.get(name)
+                    if stats is None:
+                        stats = payload[name] = dict(last=0, max=0, total=0, count=0)
+                    stats['last'] = size
+                    stats['max'] = max(stats['max'], size)
+                    stats['total'] += size
+                    stats['count'] += 1
+                    budget = budgets.get(name, default_budget)
+                    if budget is not None and size > budget:
+                        over.append(f'{name} ({size} > {budget} bytes)')
+            if over:
+                message = f'The following outputs of {cache_name} are over their payload budget {", ".join(over)}'
+                if on_budget == 'raise':
+                    raise self.payload_too_large(message)
+                warnings.warn(message, self.payload_warning)
 
-            if not isinstance(prop_list, (list, tuple)):
-                prop_list = [prop_list]
+        if on_budget not in ('warn', 'raise'):
+            raise ValueError(f"on_budget must be 'warn' or 'raise', not {on_budget!r}")
+        # Sizes in bytes of the outputs by key, see check_payload
+        payload = None if payload_budget is None else {}
+        if isinstance(payload_budget, dict):
+            default_budget = None
+            budgets = {self.key_name(key): budget for key, budget in payload_budget.items()}
+        else:
+            default_budget = None if payload_budget is True else payload_budget
+            budgets = {}
 
-            out_list = []
-            for prop in prop_list:
-                if isinstance(prop, (list, tuple)) and recurse:
-                    out_list.append(from_dict(output_values, prop, recurse=False))
-                else:
-                    if allow_missing:
-                        out_list.append(output_values.get(property_to_key(prop), dash.no_update))
-                    else:  # Throw Key error if value is missing
-                        out_list.append(output_values[property_to_key(prop)])
+        func = self.synchronous(func)
+        if parallel is not None:
+            func = self.parallel_runner([func] + [self.synchronous(f) for f in parallel], executor, conflicts)
+        if handlers is not None:
+            handlers = {key: self.synchronous(handler) for key, handler in handlers.items()}
+            if cache is not None:
+                raise ValueError("The 'cache' option can't be combined with 'handlers'")
+            func = self.handler_dispatcher(handlers, func, dependencies and dependencies[1])
+        if timeout is not None:
+            deadline = self.callback_deadline(timeout, on_timeout)
+            func = deadline.wrap(func)
+        else:
+            deadline = None
+        # The function returning the session of the request for 'coalesce', 'supersede', 'throttle' and 'debounce'
+        if session is None:
+            session = self.session_id if supersede is True or not supersede else supersede
+        if supersede:
+            if coalesce:
+                raise ValueError("The 'supersede' option can't be combined with 'coalesce'")
+            sequence = self.request_sequence(session)
+            func = sequence.wrap(func)
+        else:
+            sequence = None
+        if throttle is not None or debounce is not None:
+            if coalesce:
+                raise ValueError("The 'throttle' and 'debounce' options can't be combined with 'coalesce'")
+            limiter = self.rate_limiter(session, throttle, debounce, on_throttle)
+            func = limiter.wrap(func)
+        else:
+            limiter = None
+        if cache is True:
+            cache = memory_cache()
+        cache_name = f"{func.__module__}.{func.__qualname__}"
+        if profile:
+            self.profiler.enable(cache_name, every=profile)
 
-            return out_list
+        if columnar:
+            if dependencies is None:
+                raise ValueError("The 'columnar' option needs the dependencies of the callback")
+            if columnar == 'numpy' and numpy is None:
+                raise ValueError("columnar='numpy' needs NumPy to be installed")
 
-        @wraps(func)
-        def wrapped_func(*args, **kwargs):
+        # The key plans for outputs, inputs and states in that order
+        plans = []
+        if dependencies is not None:
+            plans.extend(self.key_plan.from_dependencies(deps, columnar=columnar if number else False)
+                         for number, deps in enumerate(dependencies))
+
+        # Concurrent calls with the same inputs and states share one execution, unless
+        # coalesce is 'global' only within a session
+        if coalesce not in (False, None, True, 'global'):
+            raise ValueError(f"coalesce must be True or 'global', not {coalesce!r}")
+        flights = single_flight() if coalesce else None
+        flight_session = session if coalesce is True else None
+        keyed = cache is not None or flights is not None
+
+        def compute(key, inputs, state):
+            """Calls func and caches its output, this is for 'cache' and 'coalesce'"""
+            output_dict = func(inputs, state)  # %% callback invoked %%
+            if cache is not None and not isinstance(output_dict, self.fallback_dict):
+                cache.store(key, output_dict)
+            return output_dict
+
+        def invoke(args, kwargs, record):
+                """The body of wrapped_func, record is None unless instruments are added"""
+                if record is not None:
+                    timings = record['timings']
+                    started = perf_counter()
                 ctx = dash.callback_context
-                inputs = to_dict(args[0:len(ctx.inputs_list)], ctx.inputs_list)
-                state = to_dict(args[len(ctx.inputs_list):], ctx.states_list)
-                output_dict = func(inputs, state, **kwargs)  # %% callback invoked %%
+                if not plans:
+                    plans.extend(self.key_plan.from_context(prop_list)
+                                 for prop_list in (ctx.outputs_list, ctx.inputs_list, ctx.states_list))
+                output_plan, input_plan, state_plan = plans
+
+                # The callback context is only consulted if there are wildcards to resolve
+                n_inputs = len(input_plan.keys)
+                if lazy:
+                    inputs = input_plan.to_lazy_dict(args[0:n_inputs], input_plan.contextual and ctx.inputs_list)
+                    state = state_plan.to_lazy_dict(args[n_inputs:], state_plan.contextual and ctx.states_list)
+                else:
+                    inputs = input_plan.to_dict(args[0:n_inputs], input_plan.contextual and ctx.inputs_list)
+                    state = state_plan.to_dict(args[n_inputs:], state_plan.contextual and ctx.states_list)
+                output_keys = output_plan.resolve(output_plan.dynamic and ctx.outputs_list)
+                if diff_outputs:
+                    fingerprints = fingerprint_sent(output_keys, inputs, state)
+                if record is not None:
+                    timings['to_dict'], started = perf_counter() - started, perf_counter()
+                key = request_key(cache_name, inputs, state) if keyed and not kwargs else None
+                if key is not None:
+                    found, output_dict = cache.lookup(key) if cache is not None else (False, None)
+                    if not found:
+                        if flights is not None:
+                            flight = key if flight_session is None else (flight_session(), key)
+                            output_dict = flights.run(flight, compute, key, inputs, state)
+                        else:
+                            output_dict = compute(key, inputs, state)
+                    if record is not None and cache is not None:
+                        record['cache_hit'] = found
+                else:
+                    output_dict = func(inputs, state, **kwargs)  # %% callback invoked %%
+                if record is not None:
+                    timings['callback'], started = perf_counter() - started, perf_counter()
                 # As with standard callback, we still support the returning of a single
                 # no_update to prevent updating
 
@@ -171,25 +1098,180 @@ class _DashDictCallbackPlugin():
                 if output_dict == None:
                     output_dict = {}
 
-                output_value = from_dict(output_dict, ctx.outputs_list)
+                output_value = output_plan.from_dict(output_dict, output_keys, allow_missing)
+                if record is not None:
+                    timings['from_dict'], started = perf_counter() - started, perf_counter()
                 if strict:
                     # Check to see if there are any excess keys in strict mode
-                    excess_keys = set(output_dict.keys()) - set(get_keys_from_list(ctx.outputs_list))
+                    excess_keys = output_plan.excess_keys(output_dict, output_keys)
                     if excess_keys:
-                        raise KeyError(f'The following keys were note found {",".join(list(excess_keys))}')
+                        raise KeyError(f'The following keys were note found {",".join(map(str, excess_keys))}')
+                    if record is not None:
+                        timings['strict'] = perf_counter() - started
+                if diff_outputs and fingerprints:
+                    drop_unchanged(output_value, output_keys, fingerprints)
+                if payload is not None:
+                    check_payload(output_value, output_keys)
 
                 # If the expected output is not a list we need to unwrap it from our list
 
-                if not isinstance(ctx.outputs_list, (list, tuple)):
+                if output_plan.single:
                     output_value = output_value[0]
 
                 return output_value
 
+        def instrumented(args, kwargs):
+            instruments = self.instruments
+            if not instruments:
+                return invoke(args, kwargs, None)
+            record = self.instrument_record(cache_name, cache)
+            for instrument in instruments:
+                instrument.before(record)
+            started = perf_counter()
+            try:
+                output_value = invoke(args, kwargs, record)
+                record['duration'] = perf_counter() - started
+                if any(instrument.measure_output for instrument in instruments):
+                    record['output_bytes'] = self.serialized_size(output_value)
+                return output_value
+            except PreventUpdate:
+                record['outcome'] = 'prevented'
+                raise
+            except Exception:
+                record['outcome'] = 'error'
+                raise
+            finally:
+                if record['duration'] is None:
+                    record['duration'] = perf_counter() - started
+                for instrument in instruments:
+                    instrument.after(record)
+
+        @wraps(func)
+        def wrapped_func(*args, **kwargs):
+            profiler = self.profiler
+            if profiler.rates and profiler.sample(cache_name):
+                return profiler.run(cache_name, instrumented, args, kwargs, directory=self.profile_directory())
+            if not self.instruments:
+                return invoke(args, kwargs, None)
+            return instrumented(args, kwargs)
+
+        wrapped_func.cache = cache
+        wrapped_func.coalesce = flights
+        wrapped_func.supersede = sequence
+        wrapped_func.rate_limit = limiter
+        wrapped_func.deadline = deadline
+        wrapped_func.payload = payload
         return wrapped_func
 
+    # Instruments seeing every dict callback invocation, see instrument.py
+    instruments = []
+    metrics = latency_aggregator()
+    # Serve the metrics at /_dict-callback/metrics on the apps plugged after it is set.
+    # The route isn't authenticated, protect it or keep it off public servers
+    serve_metrics = False
+
+    def add_instrument(self, instrument):
+        """Adds a callback_instrument, e.g. DashDictCallbackPlugin.metrics"""
+        if instrument not in self.instruments:
+            # Replace the list rather than mutate it while callbacks iterate over it
+            _DashDictCallbackPlugin.instruments = self.instruments + [instrument]
+
+    def remove_instrument(self, instrument):
+        _DashDictCallbackPlugin.instruments = [each for each in self.instruments if each is not instrument]
+
+    @staticmethod
+    def instrument_record(name, cache):
+        """The record of a dict callback invocation passed to the instruments"""
+        if not flask.has_request_context():
+            # Called directly, e.g. a function made by dictionary
+            triggered, input_bytes = [], None
+        else:
+            triggered = [t['prop_id'] for t in dash.callback_context.triggered if t['prop_id'] != '.']
+            input_bytes = flask.request.content_length
+        return dict(name=name, triggered=triggered, timings={}, duration=None, outcome='ok',
+                    cache_hit=None if cache is None else False, input_bytes=input_bytes, output_bytes=None)
+
+    class payload_warning(UserWarning):
+        """Warned when an output is over its payload budget"""
+
+    class payload_too_large(ValueError):
+        """Raised when an output is over its payload budget and on_budget is 'raise'"""
+
+    @staticmethod
+    def key_name(key):
+        """The 'id.property' name of a callback_dict key, as in the triggered prop ids"""
+        if isinstance(key, tuple):
+            id_ = json.dumps(dict(key[0]), sort_keys=True, separators=(',', ':'))
+            return f'{id_}.{key[1]}'
+        return key
+
+    @staticmethod
+    def serialized_size(value):
+        """The size in bytes of value serialized the way Dash does, None if it can't be"""
+        try:
+            return len(json.dumps(value, cls=plotly.utils.PlotlyJSONEncoder).encode('utf-8'))
+        except (TypeError, ValueError):
+            return None
+
+    # Profiles the dict callbacks enabled on it, see profile.py
+    profiler = callback_profiler()
+    profiles_lock = threading.Lock()
+    # Serve the profiles at /_dict-callback/profiles on the apps plugged after it is set.
+    # The routes aren't authenticated, protect them or keep them off public servers
+    serve_profiles = False
+
+    def profile_directory(self):
+        """
+        The directory of the profiles of the current app, its DICT_CALLBACK_PROFILES
+        setting, which defaults to a private temporary directory created when needed.
+        None outside of an app or when the profiler was given a directory, the
+        profiler then uses its own.
+        """
+        if self.profiler.directory or not flask.has_app_context():
+            return None
+        config = flask.current_app.config
+        if not config.get('DICT_CALLBACK_PROFILES'):
+            with self.profiles_lock:
+                if not config.get('DICT_CALLBACK_PROFILES'):
+                    config['DICT_CALLBACK_PROFILES'] = tempfile.mkdtemp(prefix='dash-dict-callback-profiles-')
+        return config['DICT_CALLBACK_PROFILES']
+
+    def profiles_view(self, filename=None):
+        """Lists the stored profiles of the app as json, or returns the one in filename"""
+        directory = self.profiler.resolve(self.profile_directory())
+        if filename is None:
+            return flask.jsonify(self.profiler.profiles(directory))
+        if filename not in self.profiler.files(directory):
+            flask.abort(404)
+        return flask.send_from_directory(directory, filename, mimetype='text/plain', as_attachment=True)
+
+    def metrics_view(self):
+        """The Prometheus text rendering of the metrics aggregator"""
+        return flask.Response(prometheus_text(self.metrics), mimetype='text/plain; version=0.0.4')
+
+    @staticmethod
+    def fingerprint(value):
+        """
+        Returns a value that compares equal for equal property values. Immutable
+        values are used as is, anything else is serialized with sorted keys.
+        Returns None if the value can't be serialized.
+        """
+        if value is None or type(value) in (str, int, float, bool):
+            return (type(value), value)
+        try:
+            return encode.dumps(value, sort_keys=True)
+        except (TypeError, ValueError):
+            return None
+
     def plug(self, app):
         app.dict_callback = MethodType(self.dict_callback, app)
+        app.dict_clientside_callback = MethodType(self.dict_clientside_callback, app)
         app.__class__.callback_dict = self.callback_dict
+        if app.server is not None and self.serve_metrics:
+            app._add_url('_dict-callback/metrics', self.metrics_view)
+        if app.server is not None and self.serve_profiles:
+            app._add_url('_dict-callback/profiles', self.profiles_view)
+            app._add_url('_dict-callback/profiles/<string:filename>', self.profiles_view)
     def normalize(*args):
         def flatten(l):
             """ taken from https://stackoverflow.com/questions/2158395/flatten-an-irregular-list-of-lists
@@ -211,10 +1293,31 @@ class _DashDictCallbackPlugin():
                 states.append(each)
         return outputs, inputs, states
         
-def dictionary(args=None, strict=False, allow_missing=True):
-    if callable(args):
-        return DashCallbackPlugin().dictionaryize(allow_missing, strict, args)
-    return partial(DashCallbackPlugin().dictionaryize, allow_missing, strict)
+def dictionary(*args, strict=False, allow_missing=True, **options):
+    """
+    Turns a dict function into a function taking the values a Dash callback is
+    called with and returning the list of output values, without registering it
+    on an app. Given the Output, Input and State dependencies the key plans are
+    compiled once, and the callback context is only needed to resolve wildcards.
+    Dict functions can then be unit tested, benchmarked or reused in batch jobs.
+
+        @dictionary(Output('total', 'children'), Input('a', 'value'), Input('b', 'value'))
+        def total(inputs, states):
+            return {'total.children': inputs['a.value'] + inputs['b.value']}
+
+        total(1, 2) == [3]
+
+    Used without dependencies, `@dictionary` or `@dictionary(strict=True)`, the
+    plans are compiled from the callback context on the first call. The remaining
+    keyword arguments are the options of dict_callback handled by dictionaryize.
+    """
+    if len(args) == 1 and callable(args[0]):
+        return DashDictCallbackPlugin.dictionaryize(allow_missing, strict, args[0], **options)
+    dependencies = DashDictCallbackPlugin.normalize(args) if args else None
+    return partial(DashDictCallbackPlugin.dictionaryize, allow_missing, strict, dependencies=dependencies, **options)
+
+# The plugin class under its historical name, e.g. dash.Dash(plugins=[DashCallbackPlugin()])
+DashCallbackPlugin = _DashDictCallbackPlugin
 
 # Since we always use the instantiation. Let's instantiate it
 DashDictCallbackPlugin = _DashDictCallbackPlugin()
@@ -0,0 +1,151 @@
+"""
+The local job queue of dict_callback(background=True). A background dict callback
+runs on an executor, the browser polls for the partial outputs it reports through
+its progress function and for its result. The jobs of the processes of a process
+pool report through a multiprocessing manager.
+"""
+import contextvars
+import multiprocessing
+import queue
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from time import monotonic
+
+import dash
+
+from .dicts import callback_dict
+
+
+class background_cancelled(Exception):
+    """Raised by the progress function of a background job once it was cancelled"""
+
+
+class progress_reporter():
+    """
+    Passed to background dict callbacks as the 'progress' keyword argument. Calling
+    it with a partial output dictionary sends it to the browser on the next poll.
+    Once the job was cancelled it raises background_cancelled, so long loops
+    reporting their progress stop by themselves.
+    """
+
+    def __init__(self, updates, cancelled):
+        self.updates = updates
+        self.cancelled = cancelled
+
+    def __call__(self, output=None):
+        if self.cancelled.is_set():
+            raise background_cancelled()
+        if output:
+            self.updates.put(dict(output))
+
+    def is_cancelled(self):
+        return self.cancelled.is_set()
+
+
+class background_job():
+    """A background dict callback running on an executor and its reported partial outputs"""
+
+    def __init__(self, future, updates, cancelled):
+        self.future = future
+        self.updates = updates
+        self.cancelled = cancelled
+        # When the job finished, set by the future
+        self.finished = None
+        # The exception the job raised, once collected
+        self.error = None
+        future.add_done_callback(self.done)
+
+    def done(self, future):
+        self.finished = monotonic()
+
+    def cancel(self):
+        self.cancelled.set()
+        self.future.cancel()
+
+    def drain(self, output):
+        while True:
+            try:
+                output.update(self.updates.get_nowait())
+            except queue.Empty:
+                return output
+
+    def collect(self):
+        """
+        Returns the partial outputs reported since the previous call merged in one
+        dictionary and whether the job is done, in which case its result is merged
+        last. An exception raised by the job is kept as error, the job is done.
+        """
+        output = self.drain(callback_dict())
+        if not self.future.done():
+            return output, False
+        # Updates may have been reported between the drain and the end of the job
+        self.drain(output)
+        if self.cancelled.is_set():
+            return output, True
+        try:
+            result = self.future.result()
+        except background_cancelled:
+            return output, True
+        except Exception as error:
+            self.error = error
+            return output, True
+        if result is not None and not isinstance(result, type(dash.no_update)):
+            output.update(result)
+        return output, True
+
+
+class background_manager():
+    """
+    The local job queue of the background dict callbacks. Jobs are identified by
+    a random id kept in the browser, so each browser tab only sees its own jobs.
+    A finished job is normally removed when a poll collects it. Jobs whose tab
+    was closed are never collected, they are evicted ttl seconds after they
+    finished.
+    """
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.process_manager = None
+
+    def evict(self):
+        """Removes the jobs finished more than ttl seconds ago, the lock must be held"""
+        expired = monotonic() - self.ttl
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job.finished is not None and job.finished < expired]:
+            del self.jobs[job_id]
+
+    def start(self, func, inputs, states, pool):
+        if isinstance(pool, ProcessPoolExecutor):
+            with self.lock:
+                if self.process_manager is None:
+                    self.process_manager = multiprocessing.Manager()
+            updates, cancelled = self.process_manager.Queue(), self.process_manager.Event()
+            progress = progress_reporter(updates, cancelled)
+            future = pool.submit(func, inputs, states, progress=progress)
+        else:
+            updates, cancelled = queue.Queue(), threading.Event()
+            progress = progress_reporter(updates, cancelled)
+            # Run in a copy of the context so the callback context is available
+            future = pool.submit(contextvars.copy_context().run, func, inputs, states, progress=progress)
+        job_id = uuid.uuid4().hex
+        with self.lock:
+            self.evict()
+            self.jobs[job_id] = background_job(future, updates, cancelled)
+        return job_id
+
+    def get(self, job_id):
+        with self.lock:
+            self.evict()
+            return self.jobs.get(job_id)
+
+    def pop(self, job_id):
+        with self.lock:
+            return self.jobs.pop(job_id, None)
+
+    def cancel(self, job_id):
+        job = self.pop(job_id)
+        if job is not None:
+            job.cancel()
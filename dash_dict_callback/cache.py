@@ -0,0 +1,226 @@
+"""
+Caches used by dict_callback(cache=...) to memoize callbacks that are pure functions
+of their inputs and states. A cache maps the request key of a call, computed by
+request_key from the canonicalized input and state dictionaries, to the output
+dictionary the callback returned.
+
+memory_cache is an in-process LRU cache and file_cache stores pickled outputs in a
+local directory so it can be shared by the worker processes of a server. Other
+stores can be plugged in by subclassing callback_cache and implementing load,
+store, clear and __len__.
+
+single_flight is used by dict_callback(coalesce=True) to share one execution
+between the concurrent calls with the same request key.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import plotly
+
+
+def _canonical_key(key):
+    """Converts a callback_dict key to a string independent of the order of the id"""
+    if isinstance(key, tuple):
+        # The ids of columnar entries hold the ALL wildcard itself
+        return json.dumps([sorted(key[0]), key[1]], default=repr)
+    return key
+
+
+def request_key(name, *dicts):
+    """
+    Returns a hex digest identifying a call of the callback called name with the
+    given input and state dictionaries. Pattern matched keys are canonicalized so
+    the order of the id fields doesn't matter, and values are serialized the way
+    Dash would send them. Returns None if a value can't be serialized.
+    """
+    payload = [name]
+    for values in dicts:
+        payload.append(sorted((_canonical_key(key), value) for key, value in values.items()))
+    try:
+        serialized = json.dumps(payload, cls=plotly.utils.PlotlyJSONEncoder, sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+class callback_cache():
+    """
+    Base class of the caches. It keeps the hit and miss counts, subclasses implement
+    the storage with load (returning a (found, value) tuple), store, clear and __len__.
+    maxsize bounds the number of entries and ttl, in seconds, how long they are valid.
+    """
+
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        found, value = self.load(key)
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return found, value
+
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses, size=len(self), maxsize=self.maxsize, ttl=self.ttl)
+
+    def load(self, key):
+        raise NotImplementedError
+
+    def store(self, key, value):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class memory_cache(callback_cache):
+    """An in-process least recently used cache"""
+
+    def __init__(self, maxsize=128, ttl=None):
+        super().__init__(maxsize, ttl)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def store(self, key, value):
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class file_cache(callback_cache):
+    """
+    A cache storing each output dictionary as a pickle file in directory. Since the
+    files can be shared by several processes, the least recently stored entries are
+    evicted, using the modification time of the files.
+    """
+
+    suffix = '.dictcb'
+
+    def __init__(self, directory, maxsize=1024, ttl=None):
+        super().__init__(maxsize, ttl)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _files(self):
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.endswith(self.suffix)]
+
+    def load(self, key):
+        path = self._path(key)
+        try:
+            if self.ttl is not None and os.path.getmtime(path) + self.ttl < time.time():
+                os.remove(path)
+                return False, None
+            with open(path, 'rb') as f:
+                return True, pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return False, None
+
+    def store(self, key, value):
+        try:
+            data = pickle.dumps(value)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        # Write to a temporary file first so readers never see a partial file
+        fd, temp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, self._path(key))
+        files = self._files()
+        if len(files) > self.maxsize:
+            files.sort(key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0)
+            for path in files[:len(files) - self.maxsize]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def clear(self):
+        for path in self._files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def __len__(self):
+        return len(self._files())
+
+
+class single_flight():
+    """
+    Runs one call per request key at a time. The calls made with the same key while
+    it runs wait for it and share its result, or its exception. executed counts the
+    calls that ran and shared those that waited for another one.
+    """
+
+    def __init__(self):
+        self.executed = 0
+        self.shared = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, func, *args):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = self._calls[key] = Future()
+                self.executed += 1
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        return dict(executed=self.executed, shared=self.shared, in_flight=len(self._calls))
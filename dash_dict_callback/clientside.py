@@ -0,0 +1,148 @@
+"""
+The JavaScript side of app.dict_clientside_callback. The dict function runs in the
+browser and gets the inputs and states objects Dash builds for the clientside
+callback context, keyed 'id.property' for string ids and by the sorted, compact
+JSON of the id for pattern matched ids, e.g. '{"index":1,"type":"row"}.value',
+which is the key_name of the server side keys. window.dash_dict_clientside.key(id,
+property) builds such a key. The object the function returns is mapped onto the
+outputs with the same strict and allow_missing semantics as dict_callback.
+
+The runtime below is added once to the inline scripts of the app, each callback
+is registered as a small wrapper passing the description of its outputs to it.
+"""
+import json
+
+from dash.dependencies import ClientsideFunction, MATCH, ALL, ALLSMALLER
+
+RUNTIME = """
+window.dash_dict_clientside = window.dash_dict_clientside || (function () {
+    function stringifyId(id) {
+        if (typeof id !== 'object') {
+            return id;
+        }
+        return '{' + Object.keys(id).sort().map(function (field) {
+            return JSON.stringify(field) + ':' + JSON.stringify(id[field]);
+        }).join(',') + '}';
+    }
+
+    function key(id, property) {
+        return stringifyId(id) + '.' + property;
+    }
+
+    function matched(sources, context) {
+        // The values of the MATCH fields, taken from the concrete ids of the MATCH inputs and states
+        var found = {};
+        sources.forEach(function (source) {
+            var item = (context[source.list] || [])[source.index];
+            if (item && !Array.isArray(item) && typeof item.id === 'object') {
+                source.match.forEach(function (field) {
+                    if (!(field in found)) {
+                        found[field] = item.id[field];
+                    }
+                });
+            }
+        });
+        return found;
+    }
+
+    function outputKeys(spec, context) {
+        var found = spec.match_from.length ? matched(spec.match_from, context) : {};
+        return spec.outputs.map(function (output) {
+            if (!output.match) {
+                return output.key;
+            }
+            var id = Object.assign({}, output.id);
+            output.match.forEach(function (field) {
+                id[field] = found[field];
+            });
+            return key(id, output.property);
+        });
+    }
+
+    function run(func, spec) {
+        var dc = window.dash_clientside;
+        var context = dc.callback_context;
+        var result = func(Object.assign({}, context.inputs), Object.assign({}, context.states));
+        if (result === dc.no_update) {
+            throw dc.PreventUpdate;
+        }
+        if (result === null || result === undefined) {
+            result = {};
+        }
+        var keys = outputKeys(spec, context);
+        var missing = keys.filter(function (k) {
+            return !Object.prototype.hasOwnProperty.call(result, k);
+        });
+        if (missing.length && !spec.allow_missing) {
+            throw new Error('The following keys were missing ' + missing.join(','));
+        }
+        if (spec.strict) {
+            var excess = Object.keys(result).filter(function (k) {
+                return keys.indexOf(k) < 0;
+            });
+            if (excess.length) {
+                throw new Error('The following keys were not found ' + excess.join(','));
+            }
+        }
+        return keys.map(function (k) {
+            return Object.prototype.hasOwnProperty.call(result, k) ? result[k] : dc.no_update;
+        });
+    }
+
+    return {key: key, run: run};
+})();
+"""
+
+WRAPPER = """function () {{
+    return window.dash_dict_clientside.run({function}, {spec});
+}}"""
+
+
+def match_fields(id_):
+    """The sorted fields of a pattern matched id that are MATCH wildcards"""
+    if not isinstance(id_, dict):
+        return []
+    return sorted(field for field, value in id_.items() if value == MATCH)
+
+
+def match_sources(inputs, states):
+    """
+    Describes the MATCH inputs and states by their position in the inputs_list and
+    states_list of the callback context. The values of the MATCH fields of the
+    outputs are only read from their ids.
+    """
+    return [dict(list=name, index=index, match=match_fields(dependency.component_id))
+            for name, dependencies in (('inputs_list', inputs), ('states_list', states))
+            for index, dependency in enumerate(dependencies) if match_fields(dependency.component_id)]
+
+
+def output_spec(output):
+    """Describes an Output for the runtime, the fields of a MATCH id are filled in the browser"""
+    id_ = output.component_id
+    prop = output.component_property
+    if not isinstance(id_, dict):
+        return dict(key=f'{id_}.{prop}')
+    if any(value in (ALL, ALLSMALLER) for value in id_.values()):
+        raise ValueError(f'{output} : ALL outputs are not supported by dict_clientside_callback')
+    match = match_fields(id_)
+    if not match:
+        return dict(key=f'{json.dumps(id_, sort_keys=True, separators=(",", ":"))}.{prop}')
+    return dict(id={field: value for field, value in id_.items() if field not in match},
+                property=prop, match=match)
+
+
+def wrapper(clientside_function, outputs, inputs, states, strict, allow_missing):
+    """
+    The source of the function registered with app.clientside_callback. The dict
+    function is given as the source of a JavaScript function or as a
+    ClientsideFunction, which is looked up in window.dash_clientside when called.
+    """
+    if isinstance(clientside_function, ClientsideFunction):
+        function = (f'window.dash_clientside[{json.dumps(clientside_function.namespace)}]'
+                    f'[{json.dumps(clientside_function.function_name)}]')
+    else:
+        function = f'({clientside_function.strip()})'
+    outputs = [output_spec(output) for output in outputs]
+    match_from = match_sources(inputs, states) if any('match' in output for output in outputs) else []
+    spec = dict(outputs=outputs, match_from=match_from, strict=strict, allow_missing=allow_missing)
+    return WRAPPER.format(function=function, spec=json.dumps(spec))
@@ -0,0 +1,119 @@
+"""
+The callback_deadline of dict_callback(timeout=...), which waits a limited time for
+a dict callback and sends a fallback output once it is exceeded.
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial, wraps
+from time import monotonic
+
+from dash.exceptions import PreventUpdate
+
+from .cache import memory_cache, request_key
+from .dicts import callback_dict, materialize
+
+
+# The monotonic time at which the running dict callback times out, see 'timeout'
+current_deadline = contextvars.ContextVar('dict_callback_deadline', default=None)
+
+
+class callback_timeout(TimeoutError):
+    """Raised when a dict callback runs past its timeout and on_timeout is 'raise'"""
+
+
+class fallback_dict(callback_dict):
+    """The output dict sent in place of a timed out callback, it is never cached"""
+
+
+def with_deadline(deadline, func, inputs, states):
+    """Calls func with the deadline set for remaining and checkpoint"""
+    current_deadline.set(deadline)
+    return func(inputs, states)  # %% callback invoked %%
+
+
+class callback_deadline():
+    """
+    Runs a dict callback on an executor and waits at most timeout seconds for it.
+    A Python function can't be stopped from the outside, past the deadline it is
+    left to finish in the background (checkpoint raises PreventUpdate so it can
+    stop early) and on_timeout decides what is sent: 'no_update', 'raise' for a
+    callback_timeout error, 'last' for the last output dict the callback returned
+    for the same inputs and states, an output dict or a function of the inputs
+    and states returning one. The outputs kept for 'last' are in a memory_cache
+    keyed by the request key, so they are never shared between different inputs.
+    The callback runs on a thread pool of its own, the runaway calls of one
+    callback never hold the workers of the shared pools.
+    """
+
+    def __init__(self, timeout, on_timeout='no_update', maxsize=128):
+        if not timeout > 0:
+            raise ValueError(f"timeout must be a positive number of seconds, not {timeout!r}")
+        if on_timeout not in ('no_update', 'raise', 'last') and not isinstance(on_timeout, dict) \
+                and not callable(on_timeout):
+            raise ValueError("on_timeout must be 'no_update', 'raise', 'last', an output dict or a function")
+        self.timeout = timeout
+        self.on_timeout = on_timeout
+        self.timeouts = 0
+        self.calls = 0
+        self.last = memory_cache(maxsize=maxsize) if on_timeout == 'last' else None
+        self.pool = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        """The thread pool of the callback, created on first use"""
+        with self._lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(thread_name_prefix='dict-callback-timeout')
+            return self.pool
+
+    def stats(self):
+        return dict(calls=self.calls, timeouts=self.timeouts)
+
+    def keep(self, key, future):
+        """Keeps the output of each finished call, including the late ones, for on_timeout='last'"""
+        if not future.cancelled() and future.exception() is None and isinstance(future.result(), dict):
+            self.last.store(key, future.result())
+
+    def fallback(self, name, key, inputs, states):
+        if self.on_timeout == 'raise':
+            raise callback_timeout(f'{name} did not finish in {self.timeout} seconds')
+        if self.on_timeout == 'last':
+            found, output = self.last.lookup(key) if key is not None else (False, None)
+            if not found:
+                raise PreventUpdate
+        elif self.on_timeout == 'no_update':
+            raise PreventUpdate
+        elif callable(self.on_timeout):
+            output = self.on_timeout(inputs, states)
+        else:
+            output = self.on_timeout
+        return fallback_dict(output)
+
+    def wrap(self, func):
+        """Returns func run under the deadline on the thread pool of the callback"""
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        def run(inputs, states):
+            deadline = monotonic() + self.timeout
+            materialize(inputs, states)
+            # The callback context is available in a copy of the context
+            future = self.executor().submit(contextvars.copy_context().run, with_deadline, deadline, func,
+                                            inputs, states)
+            key = request_key(name, inputs, states) if self.last is not None else None
+            if key is not None:
+                future.add_done_callback(partial(self.keep, key))
+            with self._lock:
+                self.calls += 1
+            try:
+                return future.result(max(0.0, deadline - monotonic()))
+            except FutureTimeoutError:
+                if not future.done():
+                    future.cancel()
+                    with self._lock:
+                        self.timeouts += 1
+                    return self.fallback(name, key, inputs, states)
+                return future.result()
+
+        return wraps(func)(run)
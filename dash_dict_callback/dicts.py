@@ -0,0 +1,468 @@
+"""
+The dictionaries handed to dict callbacks. callback_dict maps 'id.property' keys,
+and pattern_key keys for pattern matched ids, to their values. lazy_callback_dict
+only builds its entries when they are needed, callback_column holds a whole ALL or
+ALLSMALLER pattern with dict_callback(columnar=...) and pattern_view is the result
+of callback_dict.pselect.
+"""
+
+
+class pattern_key(tuple):
+    """
+    The key used in a callback_dict for a pattern matched id and property. It is
+    the tuple (frozenset of the id items, property) so it compares and hashes
+    the same as keys built by hand, regardless of the order of the keys in the id.
+
+    Keys are interned, so the same id and property always give the same object.
+    Dictionary lookups with an interned key succeed on the identity check, and
+    since frozenset and str cache their hash, hashing one is cheap. The original
+    id is kept in the id attribute so it doesn't need to be rebuilt from the
+    frozenset. That dict is shared by every request, pkeys hands out copies of it.
+    """
+
+    # Bound on the number of interned keys. Keys are compared by value so the
+    # keys already handed out remain valid once the table is cleared.
+    intern_limit = 65536
+    _interned = {}
+
+    def __new__(cls, id_, property):
+        # The table is keyed by the items in the order of the id, so a hit doesn't
+        # build the frozenset, and by the frozenset so the same id in another order
+        # gives the same key. A tuple never equals a frozenset, they can't collide.
+        interned = cls._interned
+        items = tuple(id_.items())
+        try:
+            return interned[items, property]
+        except KeyError:
+            pass
+        if len(interned) >= cls.intern_limit:
+            interned.clear()
+        ids = frozenset(items)
+        key = interned.get((ids, property))
+        if key is None:
+            key = tuple.__new__(cls, (ids, property))
+            key.id = dict(id_)
+            interned[ids, property] = key
+        interned[items, property] = key
+        return key
+
+    @classmethod
+    def intern(cls, id_, property):
+        """The interned key of id_ and property, without the cost of calling the class"""
+        try:
+            return cls._interned[tuple(id_.items()), property]
+        except KeyError:
+            return cls(id_, property)
+
+    def __getnewargs__(self):
+        return (self.id, self[1])
+
+    @property
+    def property(self):
+        return self[1]
+
+
+class pattern_view():
+    """
+    A read only view of the pattern matched entries of a callback_dict selected
+    by pselect. It only holds the selected keys, values are read from the
+    callback_dict when accessed so nothing is copied. The keys are those present
+    when pselect was called, values reflect the current state of the dictionary.
+    """
+
+    def __init__(self, source, keys):
+        self._source = source
+        self._keys = keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __repr__(self):
+        return f"pattern_view({list(self.items())!r})"
+
+    def keys(self):
+        return self._keys
+
+    def values(self):
+        source = self._source
+        return (source[k] for k in self._keys)
+
+    def items(self):
+        source = self._source
+        return ((k, source[k]) for k in self._keys)
+
+    def pkeys(self):
+        key_id = callback_dict._key_id
+        return [(dict(key_id(k)), k[1]) for k in self._keys]
+
+
+class callback_dict(dict):
+    """
+    This class is a convenience class to work with dict_callback. It extends the
+    builtin dict class by adding three methods that can be used to more easily
+    interact with pattern matching component ids.
+
+    The private method _property_key_key converts an id/property dict to
+    our internal dict label. String id components have their property are
+    mapped to 'id.property' while pattern matched id's are flattened using
+    frozenset which guarantees the id dict will map to the same immutable object
+    regardless of the order of the keys. We use the hashable tuple
+    (frozenset, property) as the key, interned as a pattern_key. This mapping
+    is centralize here.
+
+    The method pget is intended to be used with pattern matched components
+    but can be used with string id components. It can be accessed in two ways
+    the id can be supplied with the property or as long as there isn't a name
+    collision with the named parameters, the id components can be supplied by
+    themselves. For example, input.pget({type: 'btn', index: 1}, 'n_clicks')
+    or input.pget(type='btn', index=1, property='n_clicks') can be used.
+
+    The method pset is also mainly a pattern matched component convenience.
+    It sets a value in the dictionary. And has two modes of operation similar to pget.
+
+<    Finally, pkeys unpacks all the pattern matched id/property into tuples of
+    ids and properties. But only lists the pattern matched component ids.
+    The ids are shared with the keys and should not be modified.
+
+    For larger pattern matched callbacks, pselect finds the entries whose id
+    fields (and optionally property) match the criteria given as keyword arguments,
+    e.g. inputs.pselect(type='dynamic-dropdown') or inputs.pselect(index=range(10)).
+    A criterion can be a value, a collection of values or a predicate on the value.
+    It uses an index of the id fields built on the first call and dropped whenever
+    keys are added or removed, and returns a pattern_view rather than a copy.
+    """
+
+    # Index of the pattern matched keys built by pselect, see _build_index
+    _index = None
+
+    @classmethod
+    def _property_to_key(cls, prop):
+        """Converts the property to our key format for dictionaries"""
+        return cls._id_to_key(prop['id'], prop['property'])
+
+    @staticmethod
+    def _id_to_key(id_, property):
+        """Converts an id and property to our key format for dictionaries"""
+        if type(id_) == dict:
+            return pattern_key.intern(id_, property)
+        else:
+            return f"{id_}.{property}"
+
+    def pget(self, id_=None, property=None, **kwargs):
+        if not id_:
+            id_ = kwargs
+        return self[self._id_to_key(id_, property)]
+
+    def pset(self, key=None, property=None, value=None, **kwargs):
+        if not key:
+            key = kwargs
+        self[self._id_to_key(key, property)] = value
+
+    @staticmethod
+    def _key_id(key):
+        """Returns the id dict of a pattern matched key, the shared one of an interned key"""
+        if type(key) is pattern_key:
+            return key.id
+        return dict(key[0])
+
+    def pkeys(self):
+        key_id = self._key_id
+        # Copies, the ids of interned keys are shared by every request
+        return [(dict(key_id(k)), k[1]) for k in self.keys() if isinstance(k, tuple)]
+
+    def _build_index(self):
+        """
+        Indexes the pattern matched keys by property and by each (field, value) of
+        their ids. Returns the tuple (by_property, by_field) where by_property maps
+        a property to a list of keys and by_field maps a field to a dict from value
+        to a list of keys.
+        """
+        by_property = {}
+        by_field = {}
+        for key in self.keys():
+            if not isinstance(key, tuple):
+                continue
+            by_property.setdefault(key[1], []).append(key)
+            for field, value in key[0]:
+                by_field.setdefault(field, {}).setdefault(value, []).append(key)
+        return by_property, by_field
+
+    @staticmethod
+    def _matcher(match):
+        """Converts a pselect criterion into a predicate on an id value"""
+        if callable(match):
+            return match
+        if isinstance(match, (list, tuple, set, frozenset, range)):
+            return lambda value: value in match
+        return lambda value: value == match
+
+    def pselect(self, property=None, **criteria):
+        index = self._index
+        if index is None:
+            index = self._build_index()
+            # Only an indexed dict pays for tracking the changes of its keys
+            self.__class__ = indexed_callback_dict
+            self._index = index
+        by_property, by_field = index
+        key_id = self._key_id
+
+        # Gather the candidate keys and a test of a key for each criterion
+        selections = []
+        if property is not None:
+            selections.append((by_property.get(property, []), lambda key: key[1] == property))
+        for field, match in criteria.items():
+            matcher = self._matcher(match)
+            values = by_field.get(field, {})
+            if isinstance(match, (list, tuple, set, frozenset, range)):
+                if isinstance(match, (list, tuple)):
+                    # Drops the repeated values, which would select their keys twice
+                    match = dict.fromkeys(match)
+                # Walk whichever is smaller, the criterion or the indexed values
+                if len(match) > len(values):
+                    keys = [key for value, keys in values.items() if value in match for key in keys]
+                else:
+                    keys = [key for value in match for key in values.get(value, ())]
+            elif callable(match):
+                keys = [key for value, keys in values.items() if matcher(value) for key in keys]
+            else:
+                keys = values.get(match, [])
+            selections.append((keys, lambda key, field=field, matcher=matcher:
+                               field in key_id(key) and matcher(key_id(key)[field])))
+
+        if not selections:
+            keys = [key for key in self.keys() if isinstance(key, tuple)]
+        else:
+            # Start from the smallest candidate list and filter it with the other tests
+            selections.sort(key=lambda selection: len(selection[0]))
+            keys = selections[0][0]
+            if len(selections) > 1:
+                keys = [key for key in keys if all(test(key) for _, test in selections[1:])]
+        return pattern_view(self, keys)
+
+
+class indexed_callback_dict(callback_dict):
+    """
+    A callback_dict holding the index built by pselect. pselect switches a
+    callback_dict to this class and any method that can add or remove keys drops
+    the index and switches it back, so the dicts that are never indexed don't
+    pay for overriding their methods.
+    """
+
+    def _drop_index(self):
+        self._index = None
+        self.__class__ = callback_dict
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self._drop_index()
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._drop_index()
+        dict.__delitem__(self, key)
+
+    def __ior__(self, other):
+        self._drop_index()
+        return dict.__ior__(self, other)
+
+    def update(self, *args, **kwargs):
+        self._drop_index()
+        dict.update(self, *args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        self._drop_index()
+        return dict.setdefault(self, key, default)
+
+    def pop(self, *args):
+        self._drop_index()
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self._drop_index()
+        return dict.popitem(self)
+
+    def clear(self):
+        self._drop_index()
+        dict.clear(self)
+
+
+class lazy_callback_dict(callback_dict):
+    """
+    A callback_dict that holds the values and key plan of a callback by reference
+    and only builds its entries when needed. Reading a key that isn't pattern
+    matched looks up its position in the plan and returns the value directly.
+    Anything else (iterating, pattern matched keys, len, modifying...) first
+    materializes all the entries, after which it behaves as a callback_dict.
+    This is used with dict_callback(lazy=True) for callbacks with many inputs or
+    states of which only a few are read.
+    """
+
+    def __init__(self, plan, values, prop_list):
+        dict.__init__(self)
+        self._pending = (plan, values, prop_list)
+
+    def _materialize(self):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            pending[0].fill(self, pending[1], pending[2])
+
+    def __getitem__(self, key):
+        pending = self._pending
+        if pending is not None:
+            position = pending[0].positions.get(key)
+            if position is not None:
+                return pending[1][position]
+            self._materialize()
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        pending = self._pending
+        if pending is not None:
+            position = pending[0].positions.get(key)
+            if position is not None:
+                return pending[1][position]
+            self._materialize()
+        return dict.get(self, key, default)
+
+    def __contains__(self, key):
+        pending = self._pending
+        if pending is not None:
+            if key in pending[0].positions:
+                return True
+            self._materialize()
+        return dict.__contains__(self, key)
+
+    def __repr__(self):
+        self._materialize()
+        return dict.__repr__(self)
+
+    def __eq__(self, other):
+        self._materialize()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        self._materialize()
+        return dict.__ne__(self, other)
+
+    # Every other dict method materializes the entries first
+    def __iter__(self):
+        self._materialize()
+        return super().__iter__()
+
+    def __len__(self):
+        self._materialize()
+        return super().__len__()
+
+    def __reversed__(self):
+        self._materialize()
+        return super().__reversed__()
+
+    def __or__(self, other):
+        self._materialize()
+        return super().__or__(other)
+
+    def __ror__(self, other):
+        self._materialize()
+        return super().__ror__(other)
+
+    def __ior__(self, other):
+        self._materialize()
+        return super().__ior__(other)
+
+    def __setitem__(self, key, value):
+        self._materialize()
+        return super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._materialize()
+        return super().__delitem__(key)
+
+    def keys(self):
+        self._materialize()
+        return super().keys()
+
+    def values(self):
+        self._materialize()
+        return super().values()
+
+    def items(self):
+        self._materialize()
+        return super().items()
+
+    def copy(self):
+        self._materialize()
+        return super().copy()
+
+    def update(self, *args, **kwargs):
+        self._materialize()
+        return super().update(*args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        self._materialize()
+        return super().setdefault(key, default)
+
+    def pop(self, *args):
+        self._materialize()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._materialize()
+        return super().popitem()
+
+    def clear(self):
+        self._materialize()
+        return super().clear()
+
+
+def materialize(*dicts):
+    """
+    Builds the entries of the lazy dicts among dicts. Lazy dicts aren't thread
+    safe, this is called before they are shared with the threads of an executor.
+    """
+    for values in dicts:
+        if isinstance(values, lazy_callback_dict):
+            values._materialize()
+
+
+class callback_column():
+    """
+    The entry of an ALL or ALLSMALLER input or state with dict_callback(columnar=...).
+    Rather than one entry per concrete id, the whole pattern is delivered under
+    the key of the declared id, e.g. pget({'type': 'row', 'index': ALL}, 'value'),
+    as the list of concrete ids and the matching values, a list or a NumPy array.
+    """
+
+    __slots__ = ('ids', 'values')
+
+    def __init__(self, ids, values):
+        self.ids = ids
+        self.values = values
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __eq__(self, other):
+        if not isinstance(other, callback_column):
+            return NotImplemented
+        return self.ids == other.ids and list(self.values) == list(other.values)
+
+    def __repr__(self):
+        return f"callback_column(ids={self.ids!r}, values={self.values!r})"
+
+    def field(self, name):
+        """The values of the name field of the ids, e.g. field('index')"""
+        return [id_[name] for id_ in self.ids]
+
+    def items(self):
+        return zip(self.ids, self.values)
+
+    def to_plotly_json(self):
+        # Lets the cache and diff_outputs serialize columns
+        return dict(ids=self.ids, values=self.values)
@@ -0,0 +1,150 @@
+"""
+The JSON encoding used by dict_callback(fast_json=True). When orjson is installed
+it serializes the callback response, including NumPy arrays and datetimes, natively
+and hands anything else, such as components, figures and pandas objects, to the
+PlotlyJSONEncoder. Otherwise the standard json module with the PlotlyJSONEncoder is
+used, which is what Dash itself does. Both produce the same values, NaN and
+infinities become null.
+
+NumPy arrays and pandas Series or Index objects can be returned as output values
+directly. orjson writes numeric arrays straight from their buffer, without building
+a list of Python floats, and pandas columns are encoded through their array. With
+binary_arrays the numeric arrays of the traces of figure outputs are instead sent
+as base64 typed arrays, {'dtype': 'f8', 'bdata': '...', 'shape': '2,3'}, which
+plotly.js 2.28 and later decodes. Other arrays are left alone, since only figures
+decode them. The plotly.js bundled by dash_core_components is read with
+plotlyjs_version to tell whether it can.
+"""
+import base64
+import json
+import os
+import re
+
+import plotly
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - depends on the environment
+    numpy = None
+
+_plotly_encoder = plotly.utils.PlotlyJSONEncoder()
+
+# The dtypes of the typed arrays plotly.js decodes
+_typed_dtypes = ('i1', 'u1', 'i2', 'u2', 'i4', 'u4', 'f4', 'f8')
+
+
+def _is_pandas_column(obj):
+    return type(obj).__module__.startswith('pandas.') and getattr(obj, 'ndim', None) == 1 \
+        and hasattr(obj, 'to_numpy')
+
+
+def _typed_array(array):
+    """The base64 typed array of a numeric array, None if plotly.js can't decode its dtype"""
+    if array.dtype.kind not in 'iuf':
+        return None
+    if array.dtype.kind in 'iu' and array.dtype.itemsize == 8:
+        # There are no 64 bit integer typed arrays, use 32 bits if the values fit
+        smaller = numpy.dtype(f'{array.dtype.kind}4')
+        info = numpy.iinfo(smaller)
+        if array.size and (array.min() < info.min or array.max() > info.max):
+            smaller = numpy.dtype('f8')
+        array = array.astype(smaller)
+    dtype = array.dtype.str[1:]
+    if dtype not in _typed_dtypes:
+        return None
+    array = numpy.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+    typed = {'dtype': dtype, 'bdata': base64.b64encode(array.data).decode('ascii')}
+    if array.ndim > 1:
+        typed['shape'] = ','.join(map(str, array.shape))
+    return typed
+
+
+def _binary_trace(obj):
+    """obj, a trace or one of its attributes, with its numeric arrays as typed arrays"""
+    if isinstance(obj, dict):
+        return {key: _binary_trace(value) for key, value in obj.items()}
+    if _is_pandas_column(obj):
+        obj = obj.to_numpy()
+    if isinstance(obj, numpy.ndarray):
+        typed = _typed_array(obj)
+        return obj if typed is None else typed
+    if isinstance(obj, (list, tuple)) and obj and isinstance(obj[0], dict):
+        # e.g. transforms, lists of numbers aren't walked
+        return [_binary_trace(value) for value in obj]
+    return obj
+
+
+def binary_figure(value):
+    """
+    Returns a copy of the figure dict value with the numeric arrays of its traces as
+    base64 typed arrays, or value itself if it isn't a figure dict or NumPy isn't
+    installed. The arrays of the layout and of anything else aren't converted.
+    """
+    if numpy is None or not isinstance(value, dict) or not isinstance(value.get('data'), (list, tuple)):
+        return value
+    return dict(value, data=[_binary_trace(trace) if isinstance(trace, dict) else trace for trace in value['data']])
+
+
+def plotlyjs_version():
+    """The (major, minor, patch) version of the plotly.js bundled by dash_core_components, None if unknown"""
+    try:
+        import dash_core_components
+        with open(os.path.join(os.path.dirname(dash_core_components.__file__), 'plotly.min.js')) as f:
+            header = f.read(200)
+    except (ImportError, OSError):
+        return None
+    found = re.search(r'plotly\.js v(\d+)\.(\d+)\.(\d+)', header)
+    return tuple(int(part) for part in found.groups()) if found else None
+
+
+def _convert(obj):
+    """What to encode NumPy arrays and pandas columns as, obj itself for anything else"""
+    if numpy is None:
+        return obj
+    if _is_pandas_column(obj):
+        return obj.to_numpy()
+    if isinstance(obj, numpy.ndarray) and not obj.flags.c_contiguous:
+        # orjson only reads contiguous buffers, copying the buffer is still cheaper than a list
+        return numpy.ascontiguousarray(obj)
+    return obj
+
+
+def _default(obj):
+    converted = _convert(obj)
+    if converted is obj:
+        return _plotly_encoder.default(obj)
+    return converted
+
+
+class _encoder(plotly.utils.PlotlyJSONEncoder):
+    """The PlotlyJSONEncoder handling arrays and columns like the orjson path"""
+
+    def default(self, obj):
+        converted = _convert(obj)
+        if converted is obj:
+            return super().default(obj)
+        return converted
+
+
+def dumps(obj, sort_keys=False):
+    """Serializes obj to JSON bytes, raising a TypeError if it can't be"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=_default, option=option)
+        except TypeError:
+            # e.g. integers over 64 bits, let the standard encoder have a go
+            pass
+    return json.dumps(obj, cls=_encoder, sort_keys=sort_keys).encode('utf-8')
+
+
+def standard_dumps(obj):
+    """Serializes obj the way Dash does, for comparison"""
+    return json.dumps(obj, cls=plotly.utils.PlotlyJSONEncoder).encode('utf-8')
@@ -0,0 +1,111 @@
+"""
+Instrumentation of the dict callbacks. Instruments added with
+DashDictCallbackPlugin.add_instrument see every invocation of every dict callback:
+before is called with the record of the invocation when the callback starts and
+after once it finished. A record is a dictionary with
+
+    name        the module and qualified name of the callback function
+    triggered   the keys of the inputs that triggered the callback
+    timings     seconds spent in each phase: 'to_dict' building the input and state
+                dictionaries, 'callback' the function (or the cache), 'from_dict'
+                building the output list and 'strict' the excess key check
+    duration    total seconds spent in the wrapper
+    cache_hit   True or False for callbacks with a cache, None otherwise
+    input_bytes the size of the request body sent by the browser
+    output_bytes the size of the serialized outputs, only measured when an
+                instrument sets measure_output
+    outcome     'ok', 'prevented' (no update) or 'error'
+
+When no instrument is added the wrapper skips all of this.
+"""
+import threading
+from collections import deque
+
+
+class callback_instrument():
+    """Base class of the instruments, subclasses override before and/or after"""
+
+    # Serializing the outputs costs about as much as Dash does, only do it when asked
+    measure_output = False
+
+    def before(self, record):
+        pass
+
+    def after(self, record):
+        pass
+
+
+def percentile(ordered, fraction):
+    """The nearest rank percentile of an ordered list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+class latency_aggregator(callback_instrument):
+    """
+    Keeps the durations of the last window invocations of each callback, as well as
+    its call, error, prevented and cache hit counts, and computes percentiles.
+    """
+
+    quantiles = (0.5, 0.95, 0.99)
+
+    def __init__(self, window=1024):
+        self.window = window
+        self.callbacks = {}
+        self._lock = threading.Lock()
+
+    def after(self, record):
+        with self._lock:
+            stats = self.callbacks.get(record['name'])
+            if stats is None:
+                stats = self.callbacks[record['name']] = dict(
+                    durations=deque(maxlen=self.window), phases={}, calls=0, errors=0, prevented=0, cache_hits=0)
+            stats['durations'].append(record['duration'])
+            for phase, seconds in record['timings'].items():
+                stats['phases'][phase] = stats['phases'].get(phase, 0.0) + seconds
+            stats['calls'] += 1
+            stats['errors'] += record['outcome'] == 'error'
+            stats['prevented'] += record['outcome'] == 'prevented'
+            stats['cache_hits'] += record['cache_hit'] is True
+
+    def summary(self):
+        """Returns the percentiles, counts and seconds per phase of each callback"""
+        with self._lock:
+            callbacks = {name: dict(stats, durations=sorted(stats['durations']), phases=dict(stats['phases']))
+                         for name, stats in self.callbacks.items()}
+        summary = {}
+        for name, stats in callbacks.items():
+            durations = stats.pop('durations')
+            stats['quantiles'] = {q: percentile(durations, q) for q in self.quantiles}
+            summary[name] = stats
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self.callbacks.clear()
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(aggregator, prefix='dash_dict_callback'):
+    """Renders the summary of a latency_aggregator in the Prometheus text exposition format"""
+    summary = aggregator.summary()
+    lines = [f'# HELP {prefix}_duration_seconds Time spent in the dict callback wrapper.',
+             f'# TYPE {prefix}_duration_seconds summary']
+    for name, stats in summary.items():
+        for q, seconds in stats['quantiles'].items():
+            lines.append(f'{prefix}_duration_seconds{{callback="{_label(name)}",quantile="{q}"}} {seconds:.9f}')
+        lines.append(f'{prefix}_duration_seconds_count{{callback="{_label(name)}"}} {stats["calls"]}')
+    lines.append(f'# HELP {prefix}_phase_seconds_total Time spent in each phase of the dict callback wrapper.')
+    lines.append(f'# TYPE {prefix}_phase_seconds_total counter')
+    for name, stats in summary.items():
+        for phase, seconds in stats['phases'].items():
+            lines.append(f'{prefix}_phase_seconds_total{{callback="{_label(name)}",phase="{phase}"}} {seconds:.9f}')
+    for counter in ('errors', 'prevented', 'cache_hits'):
+        lines.append(f'# TYPE {prefix}_{counter}_total counter')
+        for name, stats in summary.items():
+            lines.append(f'{prefix}_{counter}_total{{callback="{_label(name)}"}} {stats[counter]}')
+    return '\n'.join(lines) + '\n'
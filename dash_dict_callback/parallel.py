@@ -0,0 +1,90 @@
+"""
+Runs the functions of dict_callback(parallel=[...]) concurrently with the same
+inputs and states and merges their output dictionaries. The thread and process
+pools are shared by all the parallel dict callbacks.
+"""
+import contextvars
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from functools import wraps
+
+import dash
+
+from .dicts import callback_dict, materialize
+
+
+def merge_results(results, conflicts='last'):
+    """
+    Merges output dictionaries. When several contain the same key, conflicts
+    decides: 'last' keeps the value of the last one, 'first' of the first one and
+    'error' raises a KeyError. Returns no_update if none of them had any output.
+    """
+    output = callback_dict()
+    for result in results:
+        if result is None or isinstance(result, type(dash.no_update)):
+            continue
+        if conflicts == 'last':
+            output.update(result)
+            continue
+        overlap = output.keys() & result.keys()
+        if overlap and conflicts == 'error':
+            raise KeyError(f'The following keys were returned more than once {",".join(map(str, overlap))}')
+        for key, value in result.items():
+            output.setdefault(key, value)
+    if not output:
+        return dash.no_update
+    return output
+
+
+def merge_outputs(funcs, inputs, states):
+    """
+    Runs each dict callback function in funcs and merges their output dictionaries,
+    later ones overriding earlier ones.
+    """
+    return merge_results(func(inputs, states) for func in funcs)
+
+
+# Executors shared by all the parallel dict callbacks, created on first use
+executors = {}
+executors_lock = threading.Lock()
+
+
+def shared_executor(kind):
+    """Returns the shared 'thread' or 'process' pool executor, or kind if it is an Executor"""
+    if isinstance(kind, Executor):
+        return kind
+    if kind not in ('thread', 'process'):
+        raise ValueError(f"executor must be 'thread', 'process' or an Executor, not {kind!r}")
+    with executors_lock:
+        if kind not in executors:
+            executors[kind] = ThreadPoolExecutor() if kind == 'thread' else ProcessPoolExecutor()
+        return executors[kind]
+
+
+def parallel_runner(funcs, executor='thread', conflicts='error'):
+    """
+    Returns a dict callback running all the funcs concurrently on the executor
+    with the same inputs and states, and merging their output dictionaries
+    according to conflicts (see merge_results).
+    """
+    if conflicts not in ('error', 'first', 'last'):
+        raise ValueError(f"conflicts must be 'error', 'first' or 'last', not {conflicts!r}")
+    funcs = list(funcs)
+    in_process = not isinstance(executor, ProcessPoolExecutor) and executor != 'process'
+
+    def run(inputs, states):
+        pool = shared_executor(executor)
+        materialize(inputs, states)
+        if in_process:
+            # Each function runs in a copy of the context so the callback context is available
+            futures = [pool.submit(contextvars.copy_context().run, func, inputs, states) for func in funcs[1:]]
+        else:
+            copies = callback_dict(inputs), callback_dict(states)
+            futures = [pool.submit(func, *copies) for func in funcs[1:]]
+        # The first function runs in this thread, so a runner started on a pool never waits
+        # for a worker of it. The decorated function is also bound to Dash's wrapper under
+        # its name so it couldn't be pickled for a process pool
+        first = funcs[0](inputs, states)
+        return merge_results([first] + [future.result() for future in futures], conflicts)
+
+    return wraps(funcs[0])(run)
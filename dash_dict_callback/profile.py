@@ -0,0 +1,155 @@
+"""
+Sampled profiling of selected dict callbacks. DashDictCallbackPlugin.profiler is a
+callback_profiler, profiling of a callback is switched on at runtime with
+
+    DashDictCallbackPlugin.profiler.enable(update_graph, every=10)
+
+or from the start with dict_callback(profile=10). One in every calls of the callback
+is then traced with sys.setprofile, which only sees the thread handling the
+request, and the time spent in each stack is written in the collapsed stack format
+read by flamegraph.pl and speedscope, one 'frame;frame;frame microseconds' line
+per stack. The profiles are kept in a directory holding at most ring files, the
+oldest being removed first. The plugin keeps the profiles of each app in its own
+directory, which the methods below take as their directory argument.
+"""
+import itertools
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from time import perf_counter
+
+
+def callback_name(callback):
+    """The name used for a callback, the module and qualified name of its function"""
+    if isinstance(callback, str):
+        return callback
+    return f"{callback.__module__}.{callback.__qualname__}"
+
+
+class stack_tracer():
+    """A sys.setprofile function adding up the time spent in each stack"""
+
+    def __init__(self):
+        self.stack = []
+        self.totals = {}
+        self.last = perf_counter()
+
+    def __call__(self, frame, event, arg):
+        now = perf_counter()
+        if self.stack:
+            stack = tuple(self.stack)
+            self.totals[stack] = self.totals.get(stack, 0.0) + now - self.last
+        if event == 'call':
+            code = frame.f_code
+            self.stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        elif event == 'c_call':
+            self.stack.append(getattr(arg, '__qualname__', None) or repr(arg))
+        elif self.stack:
+            self.stack.pop()
+        self.last = perf_counter()
+
+    def collapsed(self):
+        lines = []
+        for stack, seconds in self.totals.items():
+            microseconds = int(seconds * 1e6)
+            if microseconds:
+                lines.append(f"{';'.join(frame.replace(';', ':') for frame in stack)} {microseconds}")
+        return '\n'.join(lines) + '\n'
+
+
+class callback_profiler():
+    """
+    Decides which calls of which callbacks are profiled and stores the profiles.
+    directory is used for all the profiles when given. Otherwise the directory is
+    given by the caller, or is a private temporary directory created when the first
+    profile is written.
+    """
+
+    suffix = '.collapsed'
+
+    def __init__(self, directory=None, ring=64):
+        self.directory = directory
+        self.ring = ring
+        self.rates = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._temporary = None
+
+    def resolve(self, directory=None):
+        """The directory profiles are kept in, directory if the profiler wasn't given one"""
+        if self.directory or directory:
+            return self.directory or directory
+        with self._lock:
+            if self._temporary is None:
+                self._temporary = tempfile.mkdtemp(prefix='dash-dict-callback-profiles-')
+            return self._temporary
+
+    def enable(self, callback, every=1):
+        """Profiles one in every calls of callback, a function or its name"""
+        name = callback_name(callback)
+        self._counters[name] = itertools.count()
+        self.rates = dict(self.rates, **{name: every})
+
+    def disable(self, callback=None):
+        """Stops profiling callback, or every callback if it isn't given"""
+        if callback is None:
+            self.rates = {}
+        else:
+            self.rates = {name: every for name, every in self.rates.items() if name != callback_name(callback)}
+
+    def sample(self, name):
+        every = self.rates.get(name)
+        return every is not None and next(self._counters[name]) % every == 0
+
+    def run(self, name, func, *args, directory=None):
+        """Calls func with args while tracing it and stores the profile"""
+        tracer = stack_tracer()
+        previous = sys.getprofile()
+        sys.setprofile(tracer)
+        try:
+            return func(*args)
+        finally:
+            sys.setprofile(previous)
+            self.store(name, tracer.collapsed(), directory)
+
+    def store(self, name, collapsed, directory=None):
+        directory = self.resolve(directory)
+        os.makedirs(directory, exist_ok=True)
+        filename = f"{time.time_ns()}-{re.sub(r'[^A-Za-z0-9_.]', '_', name)}{self.suffix}"
+        # Write to a temporary file first so the route never serves a partial profile
+        fd, temp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            f.write(collapsed)
+        os.replace(temp_path, os.path.join(directory, filename))
+        with self._lock:
+            files = self.files(directory)
+            for old in files[:len(files) - self.ring]:
+                try:
+                    os.remove(os.path.join(directory, old))
+                except OSError:
+                    pass
+
+    def files(self, directory=None):
+        """The names of the stored profiles, oldest first"""
+        try:
+            names = os.listdir(self.resolve(directory))
+        except OSError:
+            return []
+        return sorted((name for name in names if name.endswith(self.suffix) and name.partition('-')[0].isdigit()),
+                      key=lambda name: int(name.partition('-')[0]))
+
+    def profiles(self, directory=None):
+        """Describes the stored profiles, newest first"""
+        directory = self.resolve(directory)
+        profiles = []
+        for filename in reversed(self.files(directory)):
+            created, _, callback = filename[:-len(self.suffix)].partition('-')
+            try:
+                size = os.path.getsize(os.path.join(directory, filename))
+            except OSError:
+                continue
+            profiles.append(dict(file=filename, callback=callback, created=int(created) / 1e9, size=size))
+        return profiles
@@ -0,0 +1,104 @@
+"""
+The rate_limiter of dict_callback(throttle=..., debounce=...), limiting how often a
+dict callback runs for each session.
+"""
+import itertools
+import threading
+from functools import wraps
+from time import monotonic, sleep
+
+import dash
+import flask
+from dash.exceptions import PreventUpdate
+
+from .sequence import request_scope
+
+
+class rate_limiter():
+    """
+    Enforces the 'throttle' and 'debounce' intervals, in seconds, of a dict callback
+    per session and outputs. A request within the throttle interval of the last run
+    returns right away without running the callback. With debounce a request
+    waits for the interval and only runs if no newer request arrived meanwhile,
+    so the last value of a burst is always handled. The requests suppressed are
+    counted as throttled or debounced.
+    """
+
+    # Above this many sessions the expired ones are forgotten
+    prune = 1024
+
+    def __init__(self, session, throttle=None, debounce=None, on_throttle='no_update'):
+        if on_throttle not in ('no_update', 'last'):
+            raise ValueError(f"on_throttle must be 'no_update' or 'last', not {on_throttle!r}")
+        for name, interval in (('throttle', throttle), ('debounce', debounce)):
+            if interval is not None and not interval > 0:
+                raise ValueError(f"{name} must be a positive number of seconds, not {interval!r}")
+        self.session = session
+        self.throttle = throttle
+        self.debounce = debounce
+        self.on_throttle = on_throttle
+        self.throttled = 0
+        self.debounced = 0
+        # The time of the last run of each scope and its output dict for on_throttle='last'
+        self.runs = {}
+        # The number of the latest request of each scope waiting for the debounce interval
+        self.latest = {}
+        self._numbers = itertools.count()
+        self._lock = threading.Lock()
+
+    def stats(self):
+        return dict(throttled=self.throttled, debounced=self.debounced, waiting=len(self.latest),
+                    sessions=len(self.runs))
+
+    def debounced_away(self, scope):
+        """Waits for the debounce interval, returns True if a newer request arrived meanwhile"""
+        number = next(self._numbers)
+        with self._lock:
+            self.latest[scope] = number
+        sleep(self.debounce)
+        with self._lock:
+            if self.latest.get(scope) != number:
+                self.debounced += 1
+                return True
+            del self.latest[scope]
+            return False
+
+    def throttled_away(self, scope):
+        """
+        Returns the output sent by a request within the throttle interval, None if
+        the callback can run, in which case the run is recorded.
+        """
+        with self._lock:
+            now = monotonic()
+            last = self.runs.get(scope)
+            if last is not None and now - last[0] < self.throttle:
+                self.throttled += 1
+                return last[1] if self.on_throttle == 'last' and last[1] is not None else dash.no_update
+            if len(self.runs) >= self.prune:
+                self.runs = {key: run for key, run in self.runs.items() if now - run[0] < self.throttle}
+            self.runs[scope] = (now, last and last[1])
+        return None
+
+    def wrap(self, func):
+        """Returns func suppressed according to the intervals"""
+
+        def limited(inputs, states, **kwargs):
+            if not flask.has_request_context():
+                return func(inputs, states, **kwargs)
+            scope = request_scope(self.session)
+            if self.debounce and self.debounced_away(scope):
+                raise PreventUpdate
+            if self.throttle:
+                output_dict = self.throttled_away(scope)
+                if output_dict is dash.no_update:
+                    raise PreventUpdate
+                if output_dict is not None:
+                    return output_dict
+            output_dict = func(inputs, states, **kwargs)  # %% callback invoked %%
+            if self.throttle and self.on_throttle == 'last':
+                with self._lock:
+                    if scope in self.runs:
+                        self.runs[scope] = (self.runs[scope][0], output_dict)
+            return output_dict
+
+        return wraps(func)(limited)
@@ -0,0 +1,91 @@
+"""
+The sessions of dict callbacks and the request_sequence of dict_callback(supersede=...)
+telling a running callback whether a newer request of the same session made it
+stale.
+"""
+import contextvars
+import itertools
+import json
+import threading
+import uuid
+from functools import partial, wraps
+
+import dash
+import flask
+from dash.exceptions import PreventUpdate
+
+
+# Tells the running dict callback whether it is still the latest request, see 'supersede'
+current_request = contextvars.ContextVar('dict_callback_request', default=None)
+
+
+def session_id():
+    """
+    The session of the current request, a random id kept in the flask session. The
+    server needs a secret key, users behind the same proxy or NAT can't be told
+    apart by their address so there is no fallback.
+    """
+    if not flask.current_app.secret_key:
+        raise RuntimeError("The sessions of dict callbacks need a secret_key on the server, "
+                           "or pass a function returning the session of the request")
+    session = flask.session.get('_dict_callback_session')
+    if session is None:
+        session = flask.session['_dict_callback_session'] = uuid.uuid4().hex
+    return session
+
+
+def request_scope(session):
+    """The session of the current request and its outputs, MATCH callbacks are per matched ids"""
+    return session(), json.dumps(dash.callback_context.outputs_list, sort_keys=True)
+
+
+class request_sequence():
+    """
+    Numbers the requests of a dict callback per session and outputs, the older ones
+    still running are superseded by the latest one. Only the requests in flight
+    are kept and superseded counts the stale ones dropped.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.latest = {}
+        self.superseded = 0
+        self._numbers = itertools.count()
+        self._lock = threading.Lock()
+
+    def is_latest(self, scope, number):
+        return self.latest.get(scope) == number
+
+    def stats(self):
+        return dict(superseded=self.superseded, in_flight=len(self.latest))
+
+    def wrap(self, func):
+        """Returns func raising PreventUpdate instead of returning when superseded"""
+
+        def latest_only(inputs, states, **kwargs):
+            if not flask.has_request_context():
+                return func(inputs, states, **kwargs)
+            scope = request_scope(self.session)
+            number = next(self._numbers)
+            with self._lock:
+                self.latest[scope] = number
+            try:
+                token = current_request.set(partial(self.is_latest, scope, number))
+                try:
+                    output_dict = func(inputs, states, **kwargs)  # %% callback invoked %%
+                finally:
+                    current_request.reset(token)
+                if self.is_latest(scope, number):
+                    return output_dict
+                raise PreventUpdate
+            except PreventUpdate:
+                if not self.is_latest(scope, number):
+                    with self._lock:
+                        self.superseded += 1
+                raise
+            finally:
+                with self._lock:
+                    if self.latest.get(scope) == number:
+                        del self.latest[scope]
+
+        return wraps(func)(latest_only)
@@ -31,25 +31,26 @@ app.layout = html.Div(
         ),
     ]
 )
+def sync_all(inputs, states):
+    cities_selected = inputs['city-checklist.value']
+    return {'all-checklist.value': ["All"] if set(cities_selected) == set(all_cities) else []}
+
+
+def sync_cities(inputs, states):
+    all_selected = inputs['all-checklist.value']
+    return {'city-checklist.value': all_cities if all_selected else []}
+
+
 @app.dict_callback(
     Output("city-checklist", "value"),
     Output("all-checklist", "value"),
     Input("city-checklist", "value"),
     Input("all-checklist", "value"),
+    handlers={'city-checklist.value': sync_all, 'all-checklist.value': sync_cities},
 )
 def sync_checklists(inputs, states):
-    cities_selected=inputs['city-checklist.value']
-    all_selected=inputs['all-checklist.value']
-    ctx = dash.callback_context
-    input_id = ctx.triggered[0]["prop_id"].split(".")[0]
-    if input_id == "city-checklist":
-        all_selected = ["All"] if set(cities_selected) == set(all_cities) else []
-    else:
-        cities_selected = all_cities if all_selected else []
-    outputs={}
-    outputs['city-checklist.value'] = cities_selected
-    outputs['all-checklist.value'] = all_selected
-    return outputs
+    # Only called when neither checklist triggered the callback, i.e. on the initial call
+    return {}
 
 if __name__ == "__main__":
     app.run_server(debug=True)
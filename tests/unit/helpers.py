@@ -0,0 +1,39 @@
+""" Helpers to call dictionaryized functions without a running Dash server """
+import flask
+
+from dash_dict_callback import DashDictCallbackPlugin
+
+server = flask.Flask(__name__)
+
+
+def prop(id_, property, value=None):
+    return {'id': id_, 'property': property, 'value': value}
+
+
+def invoke(wrapped, outputs_list, inputs_list, states_list=(), triggered=()):
+    """ Calls a dictionaryized function the way Dash does, inside a faked callback context """
+    inputs_list, states_list = list(inputs_list), list(states_list)
+    with server.test_request_context():
+        flask.g.outputs_list = outputs_list
+        flask.g.inputs_list = inputs_list
+        flask.g.states_list = states_list
+        flask.g.triggered_inputs = [{'prop_id': t, 'value': None} for t in triggered]
+        args = [[p['value'] for p in each] if isinstance(each, list) else each['value']
+                for each in inputs_list + states_list]
+        return wrapped(*args)
+
+
+def dictionaryize(func, *dependencies, strict=False, allow_missing=True, **options):
+    return DashDictCallbackPlugin.dictionaryize(allow_missing, strict, func,
+                                                dependencies=DashDictCallbackPlugin.normalize(dependencies),
+                                                **options)
+
+
+def post_callback(app, callback_id, outputs_list, inputs_list, states_list=(), changed=(), client=None):
+    """
+    Sends a callback request to a Dash app through the Flask test client and returns the response.
+    Passing the same client keeps the cookies, i.e. the flask session, between requests.
+    """
+    body = {'output': callback_id, 'outputs': outputs_list, 'inputs': list(inputs_list),
+            'state': list(states_list), 'changedPropIds': list(changed)}
+    return (client or app.server.test_client()).post('/_dash-update-component', json=body)
@@ -0,0 +1,123 @@
+import threading
+
+import dash
+import pytest
+import dash_html_components as html
+from dash.dependencies import Input, Output
+from dash_dict_callback import DashDictCallbackPlugin
+
+from helpers import post_callback, prop
+
+
+def make_app(release, reported, finished):
+    app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+    app.layout = html.Div()
+
+    @app.dict_callback(Output('result', 'children'), Input('run', 'n_clicks'), background=True,
+                       poll='poll', job='job', progress='progress.children', cancel='cancel.n_clicks')
+    def compute(inputs, states, progress):
+        try:
+            progress({'progress.children': '50%'})
+            reported.set()
+            release.wait(5)
+            progress({'progress.children': '100%'})
+            return {'result.children': inputs['run.n_clicks'] * 2}
+        finally:
+            finished.set()
+
+    return app
+
+
+def request(app, run=1, job=None, changed=()):
+    outputs = [prop('result', 'children'), prop('progress', 'children'), prop('poll', 'disabled'),
+               prop('job', 'data')]
+    inputs = [prop('run', 'n_clicks', run), prop('poll', 'n_intervals', 0), prop('cancel', 'n_clicks', None)]
+    response = post_callback(app, app._callback_list[0]['output'], outputs, inputs,
+                             [prop('job', 'data', job)], changed=changed)
+    return response.status_code, response.get_json() and response.get_json()['response']
+
+
+def test_dcbb001_background_job_reports_progress():
+    release, reported, finished = threading.Event(), threading.Event(), threading.Event()
+    app = make_app(release, reported, finished)
+
+    status, response = request(app, changed=['run.n_clicks'])
+    job_id = response['job']['data']
+    assert response['poll'] == {'disabled': False}
+
+    assert reported.wait(5)
+    status, response = request(app, job=job_id, changed=['poll.n_intervals'])
+    assert response == {'progress': {'children': '50%'}}
+
+    release.set()
+    assert finished.wait(5)
+    DashDictCallbackPlugin.background_jobs.get(job_id).future.result(5)
+    status, response = request(app, job=job_id, changed=['poll.n_intervals'])
+    assert response == {'result': {'children': 2}, 'progress': {'children': '100%'},
+                        'poll': {'disabled': True}, 'job': {'data': None}}
+
+    # The job is gone, the poll is switched off
+    status, response = request(app, job=job_id, changed=['poll.n_intervals'])
+    assert response == {'poll': {'disabled': True}}
+
+
+def test_dcbb002_background_job_cancel():
+    release, reported, finished = threading.Event(), threading.Event(), threading.Event()
+    app = make_app(release, reported, finished)
+
+    status, response = request(app, changed=['run.n_clicks'])
+    job_id = response['job']['data']
+    assert reported.wait(5)
+    job = DashDictCallbackPlugin.background_jobs.get(job_id)
+
+    status, response = request(app, job=job_id, changed=['cancel.n_clicks'])
+    assert response == {'poll': {'disabled': True}, 'job': {'data': None}}
+    release.set()
+    assert finished.wait(5)
+    assert isinstance(job.future.exception(5), DashDictCallbackPlugin.background_cancelled)
+    assert DashDictCallbackPlugin.background_jobs.get(job_id) is None
+
+
+def test_dcbb003_uncollected_jobs_are_evicted():
+    release, reported, finished = threading.Event(), threading.Event(), threading.Event()
+    app = make_app(release, reported, finished)
+    jobs = DashDictCallbackPlugin.background_jobs
+
+    status, response = request(app, changed=['run.n_clicks'])
+    job_id = response['job']['data']
+    release.set()
+    assert finished.wait(5)
+    jobs.jobs[job_id].future.result(5)
+    # The tab was closed, nothing polls the job anymore
+    assert jobs.get(job_id) is not None
+
+    ttl, jobs.ttl = jobs.ttl, 0
+    try:
+        assert jobs.get(job_id) is None
+        assert job_id not in jobs.jobs
+    finally:
+        jobs.ttl = ttl
+
+
+def test_dcbb004_failed_job_stops_polling(caplog):
+    app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+    app.layout = html.Div()
+
+    @app.dict_callback(Output('result', 'children'), Input('run', 'n_clicks'), background=True,
+                       poll='poll', job='job', progress='progress.children', cancel='cancel.n_clicks')
+    def compute(inputs, states, progress):
+        progress({'progress.children': '50%'})
+        raise RuntimeError('broken')
+
+    status, response = request(app, changed=['run.n_clicks'])
+    job_id = response['job']['data']
+    with pytest.raises(RuntimeError):
+        DashDictCallbackPlugin.background_jobs.get(job_id).future.result(5)
+
+    # The partial outputs are sent once with the poll switched off, the error is logged
+    status, response = request(app, job=job_id, changed=['poll.n_intervals'])
+    assert status == 200
+    assert response == {'progress': {'children': '50%'}, 'poll': {'disabled': True}, 'job': {'data': None}}
+    assert DashDictCallbackPlugin.background_jobs.get(job_id) is None
+    assert [record.exc_info[1].args for record in caplog.records if record.message.endswith('compute failed')] \
+        == [('broken',)]
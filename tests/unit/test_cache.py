@@ -0,0 +1,66 @@
+import time
+
+from dash.dependencies import Input, Output, State, ALL
+from dash_dict_callback import DashDictCallbackPlugin, memory_cache, file_cache, request_key
+
+from helpers import dictionaryize, invoke, prop
+
+
+def test_dcbc001_request_key_is_canonical():
+    pattern_key = DashDictCallbackPlugin.pattern_key
+    one = {'a.value': 1, pattern_key({'type': 'x', 'index': 1}, 'value'): [1, 2]}
+    two = {(frozenset({'index': 1, 'type': 'x'}.items()), 'value'): [1, 2], 'a.value': 1}
+    assert request_key('f', one, {}) == request_key('f', two, {})
+    assert request_key('f', one, {}) != request_key('g', one, {})
+    assert request_key('f', one, {}) != request_key('f', {}, one)
+    assert request_key('f', {'a.value': object()}) is None
+
+
+def test_dcbc002_memoized_callback():
+    calls = []
+
+    def update(inputs, states):
+        calls.append(inputs)
+        return {'out.children': sum(inputs.values()) + states['st.value']}
+
+    wrapped = dictionaryize(update, Output('out', 'children'), Input({'type': 'in', 'index': ALL}, 'value'),
+                            State('st', 'value'), cache=True)
+
+    def call(values, state):
+        return invoke(wrapped, [prop('out', 'children')],
+                      [[prop({'type': 'in', 'index': i}, 'value', v) for i, v in enumerate(values)]],
+                      [prop('st', 'value', state)])
+
+    assert call([1, 2], 0) == [3]
+    assert call([1, 2], 0) == [3]
+    assert call([1, 2], 1) == [4]
+    assert len(calls) == 2
+    assert wrapped.cache.stats()['hits'] == 1 and wrapped.cache.stats()['misses'] == 2
+
+
+def test_dcbc003_memory_cache_lru_and_ttl():
+    cache = memory_cache(maxsize=2, ttl=0.05)
+    cache.store('a', 1)
+    cache.store('b', 2)
+    assert cache.lookup('a') == (True, 1)
+    cache.store('c', 3)
+    assert cache.lookup('b') == (False, None)
+    assert len(cache) == 2
+    time.sleep(0.06)
+    assert cache.lookup('a') == (False, None)
+    assert cache.hits == 1 and cache.misses == 2
+
+
+def test_dcbc004_file_cache(tmp_path):
+    cache = file_cache(str(tmp_path), maxsize=2)
+    key = DashDictCallbackPlugin.pattern_key({'type': 'x', 'index': 1}, 'children')
+    cache.store('a', {key: [1, 2]})
+    assert cache.lookup('a') == (True, {key: [1, 2]})
+    # Another instance on the same directory sees the entries
+    assert file_cache(str(tmp_path)).lookup('a') == (True, {key: [1, 2]})
+    cache.store('b', 2)
+    time.sleep(0.01)
+    cache.store('c', 3)
+    assert len(cache) == 2
+    cache.clear()
+    assert cache.lookup('c') == (False, None)
@@ -0,0 +1,138 @@
+import json
+import shutil
+import subprocess
+
+import dash
+import pytest
+import dash_html_components as html
+from dash.dependencies import Input, Output, State, ClientsideFunction, MATCH, ALL
+from dash_dict_callback import DashDictCallbackPlugin, clientside
+
+
+def make_app():
+    app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+    app.layout = html.Div()
+    return app
+
+
+def run_in_node(app, context, function_name=None):
+    """Loads the inline scripts of app in node and calls the clientside callback with context"""
+    spec = app._callback_list[-1]['clientside_function']
+    script = '\n'.join(['var window = globalThis;',
+                        'window.dash_clientside = {no_update: {_dash_no_update: "_dash_no_update"},',
+                        '                          PreventUpdate: {_dash_prevent_update: true}};'] +
+                       app._inline_scripts +
+                       [f'window.dash_clientside.callback_context = {json.dumps(context)};',
+                        'var dc = window.dash_clientside;',
+                        f'var func = dc[{json.dumps(spec["namespace"])}][{json.dumps(spec["function_name"])}];',
+                        'var result;',
+                        'try { result = func(); } catch (e) {',
+                        '    result = e === dc.PreventUpdate ? "prevented" : {error: e.message}; }',
+                        'console.log(JSON.stringify(result));'])
+    completed = subprocess.run(['node', '-e', script], capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout)
+
+
+def test_dcbs001_registration():
+    app = make_app()
+    app.dict_clientside_callback(
+        'function (inputs, states) { return {"out.children": inputs["in.value"]}; }',
+        Output('out', 'children'), Input('in', 'value'), State('st', 'value'), prevent_initial_call=True)
+    app.dict_clientside_callback(ClientsideFunction('ns', 'convert'),
+                                 Output({'type': 'row', 'index': MATCH}, 'children'),
+                                 Input({'type': 'row', 'index': MATCH}, 'value'))
+
+    first, second = app._callback_list
+    assert first['prevent_initial_call'] is True
+    assert [s['id'] for s in first['state']] == ['st']
+    # The runtime is only added once, followed by the wrappers of the callbacks
+    assert app._inline_scripts.count(clientside.RUNTIME) == 1
+    assert 'window.dash_dict_clientside.run' in app._inline_scripts[-1]
+    assert 'window.dash_clientside["ns"]["convert"]' in app._inline_scripts[-1]
+    assert second['clientside_function']['namespace'].startswith('_dashprivate_')
+
+    with pytest.raises(ValueError):
+        app.dict_clientside_callback('function (inputs, states) { return {}; }',
+                                     Output({'type': 'row', 'index': ALL}, 'children'), Input('in', 'value'))
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='needs node to run the JavaScript')
+def test_dcbs002_runtime():
+    def context(value):
+        return {'inputs': {'celsius.value': value}, 'states': {'unit.value': 'F'},
+                'inputs_list': [{'id': 'celsius', 'property': 'value', 'value': value}],
+                'states_list': [{'id': 'unit', 'property': 'value', 'value': 'F'}]}
+
+    source = '''
+        function (inputs, states) {
+            if (inputs['celsius.value'] === null) { return window.dash_clientside.no_update; }
+            if (inputs['celsius.value'] < -273) { return {'fahrenheit.value': 0, 'kelvin.value': 0}; }
+            return {'fahrenheit.value': inputs['celsius.value'] * 9 / 5 + 32,
+                    'label.children': states['unit.value']};
+        }
+    '''
+    dependencies = [Output('fahrenheit', 'value'), Output('label', 'children'), Output('other', 'children'),
+                    Input('celsius', 'value'), State('unit', 'value')]
+
+    app = make_app()
+    app.dict_clientside_callback(source, *dependencies)
+    no_update = {'_dash_no_update': '_dash_no_update'}
+    assert run_in_node(app, context(100)) == [212, 'F', no_update]
+    assert run_in_node(app, context(None)) == 'prevented'
+    # Excess keys are ignored unless strict
+    assert run_in_node(app, context(-300)) == [0, no_update, no_update]
+
+    app = make_app()
+    app.dict_clientside_callback(source, *dependencies, strict=True)
+    assert run_in_node(app, context(-300)) == {'error': 'The following keys were not found kelvin.value'}
+
+    app = make_app()
+    app.dict_clientside_callback(source, *dependencies, allow_missing=False)
+    assert run_in_node(app, context(100)) == {'error': 'The following keys were missing other.children'}
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='needs node to run the JavaScript')
+def test_dcbs003_runtime_pattern_matching():
+    app = make_app()
+    app.dict_clientside_callback(
+        '''
+        function (inputs, states) {
+            var key = window.dash_dict_clientside.key;
+            var total = 0;
+            for (var i = 0; i < 3; i++) { total += inputs[key({type: 'slider', index: i}, 'value')]; }
+            var row = states['{"index":7,"type":"row"}.value'];
+            return Object.fromEntries([[key({type: 'total', index: 7}, 'children'), total + row]]);
+        }
+        ''',
+        Output({'type': 'total', 'index': MATCH}, 'children'),
+        Input({'type': 'slider', 'index': ALL}, 'value'), State({'type': 'row', 'index': MATCH}, 'value'))
+
+    sliders = [{'id': {'type': 'slider', 'index': i}, 'property': 'value', 'value': i + 1} for i in range(3)]
+    context = {'inputs': {f'{{"index":{i},"type":"slider"}}.value': i + 1 for i in range(3)},
+               'states': {'{"index":7,"type":"row"}.value': 10},
+               'inputs_list': [sliders],
+               'states_list': [{'id': {'type': 'row', 'index': 7}, 'property': 'value', 'value': 10}]}
+    assert run_in_node(app, context) == [16]
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='needs node to run the JavaScript')
+def test_dcbs004_match_read_from_match_dependencies():
+    app = make_app()
+    app.dict_clientside_callback(
+        '''
+        function (inputs, states) {
+            var key = window.dash_dict_clientside.key;
+            var total = inputs['{"index":0,"type":"global"}.value'] + inputs['{"index":3,"type":"row"}.value'];
+            return Object.fromEntries([[key({type: 'total', index: 3}, 'children'), total]]);
+        }
+        ''',
+        Output({'type': 'total', 'index': MATCH}, 'children'),
+        Input({'type': 'global', 'index': 0}, 'value'), Input({'type': 'row', 'index': MATCH}, 'value'))
+
+    # The static input listed first doesn't give the index of the output
+    context = {'inputs': {'{"index":0,"type":"global"}.value': 1, '{"index":3,"type":"row"}.value': 10},
+               'states': {},
+               'inputs_list': [{'id': {'type': 'global', 'index': 0}, 'property': 'value', 'value': 1},
+                               {'id': {'type': 'row', 'index': 3}, 'property': 'value', 'value': 10}],
+               'states_list': []}
+    assert run_in_node(app, context) == [11]
@@ -0,0 +1,802 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import flask
+import pytest
+
+import dash
+from dash_dict_callback import DashDictCallbackPlugin
+from dash.dependencies import Input, Output, State, MATCH, ALL
+from dash.exceptions import PreventUpdate
+
+from helpers import dictionaryize, invoke, prop
+
+
+def square_sum(inputs, states):
+    """A parallel function run in a process pool, it must be defined at module level"""
+    return {'squares.children': sum(value * value for value in inputs.values())}
+
+def test_dcbu001_plain_inputs_and_outputs():
+    def update(inputs, states):
+        assert isinstance(inputs, DashDictCallbackPlugin.callback_dict)
+        return {'out-1.children': inputs['in-1.value'], 'out-2.children': states['st-1.value']}
+
+    wrapped = dictionaryize(update, Output('out-1', 'children'), Output('out-2', 'children'),
+                            Input('in-1', 'value'), State('st-1', 'value'))
+    result = invoke(wrapped, [prop('out-1', 'children'), prop('out-2', 'children')],
+                    [prop('in-1', 'value', 'a')], [prop('st-1', 'value', 'b')])
+    assert result == ['a', 'b']
+
+
+def test_dcbu002_missing_and_no_update():
+    def update(inputs, states):
+        return {'out-1.children': 1}
+
+    outputs = [prop('out-1', 'children'), prop('out-2', 'children')]
+    deps = (Output('out-1', 'children'), Output('out-2', 'children'), Input('in-1', 'value'))
+    wrapped = dictionaryize(update, *deps)
+    assert invoke(wrapped, outputs, [prop('in-1', 'value')]) == [1, dash.no_update]
+
+    wrapped = dictionaryize(update, *deps, allow_missing=False)
+    with pytest.raises(KeyError):
+        invoke(wrapped, outputs, [prop('in-1', 'value')])
+
+    wrapped = dictionaryize(lambda inputs, states: dash.no_update, *deps)
+    with pytest.raises(PreventUpdate):
+        invoke(wrapped, outputs, [prop('in-1', 'value')])
+
+
+def test_dcbu003_match_pattern():
+    def update(inputs, states):
+        (id_, property), = inputs.pkeys()
+        output = DashDictCallbackPlugin.callback_dict()
+        output.pset(type='out', index=id_['index'], property='children', value=inputs.pget(id_, 'value'))
+        return output
+
+    wrapped = dictionaryize(update, Output({'type': 'out', 'index': MATCH}, 'children'),
+                            Input({'type': 'in', 'index': MATCH}, 'value'))
+    for index in (1, 2, 1):
+        result = invoke(wrapped, [prop({'index': index, 'type': 'out'}, 'children')],
+                        [prop({'type': 'in', 'index': index}, 'value', index * 10)])
+        assert result == [index * 10]
+
+
+def test_dcbu004_all_pattern():
+    def update(inputs, states):
+        output = DashDictCallbackPlugin.callback_dict()
+        output['total.children'] = sum(inputs.values())
+        for id_, property in inputs.pkeys():
+            output.pset(type='out', index=id_['index'], property='children', value=inputs.pget(id_, property) + 1)
+        return output
+
+    wrapped = dictionaryize(update, Output({'type': 'out', 'index': ALL}, 'children'),
+                            Output('total', 'children'), Input({'type': 'in', 'index': ALL}, 'value'))
+    result = invoke(wrapped,
+                    [[prop({'type': 'out', 'index': i}, 'children') for i in range(3)],
+                     prop('total', 'children')],
+                    [[prop({'type': 'in', 'index': i}, 'value', i) for i in range(3)]])
+    assert result == [[1, 2, 3], 3]
+
+
+def test_dcbu005_compiled_from_context():
+    """ Without declared dependencies the plan is compiled from the callback context """
+    def update(inputs, states):
+        return {'out.children': inputs['in.value'],
+                (frozenset({'type': 'o', 'index': 0}.items()), 'children'): inputs.pget(type='i', index=0,
+                                                                                         property='value')}
+
+    wrapped = DashDictCallbackPlugin.dictionaryize(True, False, update)
+    for value in ('a', 'b'):
+        result = invoke(wrapped, [prop('out', 'children'), [prop({'type': 'o', 'index': 0}, 'children')]],
+                        [prop('in', 'value', value), [prop({'type': 'i', 'index': 0}, 'value', value)]])
+        assert result == [value, [value]]
+
+
+def test_dcbu006_plan_keys_are_compiled_once():
+    plan = DashDictCallbackPlugin.key_plan.from_dependencies(
+        [Input('a', 'value'), Input({'type': 'b', 'index': ALL}, 'value')])
+    assert plan.keys[0] == 'a.value'
+    keys = plan.resolve([prop('a', 'value'), [prop({'type': 'b', 'index': 1}, 'value')]])
+    again = plan.resolve([prop('a', 'value'), [prop({'index': 1, 'type': 'b'}, 'value')]])
+    assert keys[1][0] is again[1][0]
+
+
+def test_dcbu007_strict_excess_keys():
+    def update(inputs, states):
+        return {'out-1.children': 1, 'out-3.children': 3}
+
+    deps = (Output('out-1', 'children'), Output('out-2', 'children'), Input('in-1', 'value'))
+    outputs = [prop('out-1', 'children'), prop('out-2', 'children')]
+    assert invoke(dictionaryize(update, *deps), outputs, [prop('in-1', 'value')]) == [1, dash.no_update]
+    with pytest.raises(KeyError, match='out-3.children'):
+        invoke(dictionaryize(update, *deps, strict=True), outputs, [prop('in-1', 'value')])
+
+
+def test_dcbu008_strict_pattern_outputs():
+    def update(inputs, states):
+        output = DashDictCallbackPlugin.callback_dict({'total.children': 0})
+        for index in indices:
+            output.pset(type='out', index=index, property='children', value=index)
+        return output
+
+    wrapped = dictionaryize(update, Output({'type': 'out', 'index': ALL}, 'children'),
+                            Output('total', 'children'), Input('in', 'value'), strict=True)
+    outputs = [[prop({'type': 'out', 'index': i}, 'children') for i in range(3)], prop('total', 'children')]
+    indices = range(3)
+    assert invoke(wrapped, outputs, [prop('in', 'value')]) == [[0, 1, 2], 0]
+    indices = range(4)
+    with pytest.raises(KeyError):
+        invoke(wrapped, outputs, [prop('in', 'value')])
+
+
+def test_dcbu009_pattern_keys_are_interned():
+    pattern_key = DashDictCallbackPlugin.pattern_key
+    key = pattern_key({'type': 'row', 'index': 1}, 'value')
+    assert key is pattern_key({'index': 1, 'type': 'row'}, 'value')
+    assert key == (frozenset({'type': 'row', 'index': 1}.items()), 'value')
+    assert hash(key) == hash((frozenset({'type': 'row', 'index': 1}.items()), 'value'))
+    assert key.id == {'type': 'row', 'index': 1} and key.property == 'value'
+
+    values = DashDictCallbackPlugin.callback_dict()
+    values.pset(type='row', index=1, property='value', value=10)
+    values[(frozenset({'type': 'row', 'index': 2}.items()), 'value')] = 20
+    values['other.value'] = 30
+    assert values.pget(index=1, type='row', property='value') == 10
+    assert values.pget({'type': 'row', 'index': 2}, 'value') == 20
+    assert sorted(id_['index'] for id_, _ in values.pkeys()) == [1, 2]
+    assert values.pkeys()[0][0] == key.id and values.pkeys()[0][0] is not key.id
+
+
+def test_dcbu010_pselect():
+    values = DashDictCallbackPlugin.callback_dict({'other.value': 0})
+    for index in range(100):
+        values.pset(type='row' if index % 2 else 'header', index=index, property='value', value=index)
+        values.pset(type='row', index=index, property='label', value=str(index))
+
+    rows = values.pselect(type='header')
+    assert len(rows) == 50 and all(id_['type'] == 'header' for id_, _ in rows.pkeys())
+    assert sorted(values.pselect(type='row', property='value').values()) == list(range(1, 100, 2))
+    assert sorted(v for _, v in values.pselect(index=range(3), property='value').items()) == [0, 1, 2]
+    assert len(values.pselect(index=lambda i: i >= 90, type='row')) == 15
+    assert len(values.pselect(index=[1, 1, 2], type='row')) == 3
+    assert len(values.pselect(index=range(10 ** 7))) == 200
+
+    class visited(frozenset):
+        """Counts the values of the criterion pselect looks at"""
+        count = 0
+
+        def __iter__(self):
+            visited.count += len(self)
+            return super().__iter__()
+
+        def __contains__(self, value):
+            visited.count += 1
+            return super().__contains__(value)
+
+    # A criterion larger than the index isn't walked, the 100 indexed values are tested against it
+    # and so are the 100 keys of the smaller property selection
+    assert len(values.pselect(index=visited(range(10 ** 5)), property='value')) == 100
+    assert visited.count == 200
+    assert len(values.pselect(type='missing')) == 0
+    assert len(values.pselect()) == 200
+
+    # Views read the current values, adding keys rebuilds the index
+    view = values.pselect(type='header', index=0)
+    values.pset(type='header', index=0, property='value', value='changed')
+    assert list(view.values()) == ['changed']
+    values.pset(type='header', index=1000, property='value', value=1000)
+    assert len(values.pselect(type='header', property='value')) == 51
+    del values[DashDictCallbackPlugin.pattern_key({'type': 'header', 'index': 1000}, 'value')]
+    assert len(values.pselect(type='header', property='value')) == 50
+
+
+def test_dcbu011_lazy_inputs_and_states():
+    lazy_callback_dict = DashDictCallbackPlugin.lazy_callback_dict
+
+    def update(inputs, states):
+        assert isinstance(states, lazy_callback_dict)
+        value = states['st-50.value']
+        assert states.get('st-7.value') == 7 and 'st-99.value' in states
+        # Only the entries read so far were touched
+        assert dict.__len__(states) == 0
+        expected = {f'st-{i}.value': i for i in range(100)}
+        assert not (states != expected) and states == expected
+        assert ({'x': 1} | states)['st-99.value'] == 99
+        assert inputs.pget(type='in', index=1, property='value') == 'b'
+        assert len(inputs) == 3 and sorted(inputs.pselect(type='in').values()) == ['a', 'b']
+        states['extra'] = value
+        return {'out.children': value, 'total.children': len(states)}
+
+    wrapped = dictionaryize(update, Output('out', 'children'), Output('total', 'children'),
+                            Input({'type': 'in', 'index': ALL}, 'value'), Input('plain', 'value'),
+                            [State(f'st-{i}', 'value') for i in range(100)], lazy=True)
+    result = invoke(wrapped, [prop('out', 'children'), prop('total', 'children')],
+                    [[prop({'type': 'in', 'index': i}, 'value', v) for i, v in enumerate('ab')],
+                     prop('plain', 'value')],
+                    [prop(f'st-{i}', 'value', i) for i in range(100)])
+    assert result == [50, 101]
+
+
+def test_dcbu012_diff_outputs():
+    def update(inputs, states):
+        states['container.children'].append(inputs['in.value']) if inputs['in.value'] else None
+        return {'container.children': states['container.children'], 'in.value': inputs['in.value'],
+                'other.children': 'x', 'rows.data': [dict(row) for row in states['rows.data']]}
+
+    deps = (Output('container', 'children'), Output('in', 'value'), Output('other', 'children'),
+            Output('rows', 'data'), Input('in', 'value'), State('container', 'children'), State('rows', 'data'))
+    outputs = [prop('container', 'children'), prop('in', 'value'), prop('other', 'children'), prop('rows', 'data')]
+
+    def call(value, **options):
+        return invoke(dictionaryize(update, *deps, **options), outputs, [prop('in', 'value', value)],
+                      [prop('container', 'children', ['a']), prop('rows', 'data', [{'x': 1}])])
+
+    assert call(None) == [['a'], None, 'x', [{'x': 1}]]
+    assert call(None, diff_outputs=True) == [dash.no_update, dash.no_update, 'x', dash.no_update]
+    # Values changed in place are still sent
+    assert call('b', diff_outputs=True) == [['a', 'b'], dash.no_update, 'x', dash.no_update]
+
+
+def test_dcbu013_handlers():
+    calls = []
+
+    def on_city(inputs, states):
+        calls.append('city')
+        return {'all.value': ['All'] if len(inputs['city.value']) == 3 else []}
+
+    def on_all(inputs, states):
+        calls.append('all')
+        return {'city.value': ['a', 'b', 'c'] if inputs['all.value'] else []}
+
+    def on_row(inputs, states):
+        calls.append('row')
+        return {'all.value': []}
+
+    def initial(inputs, states):
+        calls.append('initial')
+        return {}
+
+    wrapped = dictionaryize(initial, Output('city', 'value'), Output('all', 'value'), Input('city', 'value'),
+                            Input('all', 'value'), Input({'type': 'row', 'index': ALL}, 'value'),
+                            handlers={'city.value': on_city, 'all.value': on_all,
+                                      (frozenset({'type': 'row', 'index': ALL}.items()), 'value'): on_row})
+    outputs = [prop('city', 'value'), prop('all', 'value')]
+    inputs = [prop('city', 'value', ['a', 'b', 'c']), prop('all', 'value', []),
+              [prop({'type': 'row', 'index': 0}, 'value', 1)]]
+
+    assert invoke(wrapped, outputs, inputs, triggered=['city.value']) == [dash.no_update, ['All']]
+    assert invoke(wrapped, outputs, inputs, triggered=['all.value']) == [[], dash.no_update]
+    assert invoke(wrapped, outputs, inputs, triggered=['{"index":0,"type":"row"}.value']) == [dash.no_update, []]
+    assert invoke(wrapped, outputs, inputs) == [dash.no_update, dash.no_update]
+    assert calls == ['city', 'all', 'row', 'initial']
+
+    calls.clear()
+    assert invoke(wrapped, outputs, inputs, triggered=['all.value', 'city.value']) == [[], ['All']]
+    assert calls == ['city', 'all']
+
+    with pytest.raises(KeyError, match='other.value'):
+        dictionaryize(initial, Output('city', 'value'), Input('city', 'value'), handlers={'other.value': on_city})
+
+
+def test_dcbu014_parallel():
+    # Every function waits for the others, so this only passes if they run concurrently
+    barrier = threading.Barrier(3, timeout=5)
+
+    def total(inputs, states):
+        barrier.wait()
+        return {'total.children': sum(inputs.values())}
+
+    def count(inputs, states):
+        barrier.wait()
+        return {'count.children': len(inputs)}
+
+    def trigger(inputs, states):
+        barrier.wait()
+        return {'trigger.children': dash.callback_context.triggered[0]['prop_id']}
+
+    dependencies = (Output('total', 'children'), Output('count', 'children'), Output('trigger', 'children'),
+                    Input({'type': 'in', 'index': ALL}, 'value'))
+    outputs = [prop('total', 'children'), prop('count', 'children'), prop('trigger', 'children')]
+    inputs = [[prop({'type': 'in', 'index': i}, 'value', i) for i in range(4)]]
+
+    wrapped = dictionaryize(total, *dependencies, parallel=[count, trigger])
+    assert invoke(wrapped, outputs, inputs, triggered=['x.value']) == [6, 4, 'x.value']
+
+    wrapped = dictionaryize(total, *dependencies, lazy=True, parallel=[count, trigger],
+                            executor=ThreadPoolExecutor(3))
+    assert invoke(wrapped, outputs, inputs, triggered=['x.value']) == [6, 4, 'x.value']
+
+
+def test_dcbu015_parallel_conflicts():
+    def first(inputs, states):
+        return {'out.children': 'first'}
+
+    def second(inputs, states):
+        return {'out.children': 'second', 'other.children': 'second'}
+
+    outputs = [prop('out', 'children'), prop('other', 'children')]
+    dependencies = (Output('out', 'children'), Output('other', 'children'), Input('in', 'value'))
+
+    wrapped = dictionaryize(first, *dependencies, parallel=[second])
+    with pytest.raises(KeyError, match='out.children'):
+        invoke(wrapped, outputs, [prop('in', 'value')])
+    wrapped = dictionaryize(first, *dependencies, parallel=[second], conflicts='first')
+    assert invoke(wrapped, outputs, [prop('in', 'value')]) == ['first', 'second']
+    wrapped = dictionaryize(first, *dependencies, parallel=[second], conflicts='last')
+    assert invoke(wrapped, outputs, [prop('in', 'value')]) == ['second', 'second']
+    with pytest.raises(ValueError):
+        dictionaryize(first, *dependencies, parallel=[second], conflicts='merge')
+
+
+def test_dcbu016_async():
+    async def fetch(value, delay):
+        await asyncio.sleep(delay)
+        return value
+
+    async def update(inputs, states):
+        assert dash.callback_context.triggered[0]['prop_id'] == 'in.value'
+        doubled, tripled = await asyncio.gather(fetch(inputs['in.value'] * 2, 0.01),
+                                                fetch(inputs['in.value'] * 3, 0.01))
+        if inputs['in.value'] == 0:
+            return dash.no_update
+        return {'double.children': doubled, 'triple.children': tripled}
+
+    async def failing(inputs, states):
+        raise ValueError('backend down')
+
+    dependencies = (Output('double', 'children'), Output('triple', 'children'), Input('in', 'value'))
+    outputs = [prop('double', 'children'), prop('triple', 'children')]
+    wrapped = dictionaryize(update, *dependencies, strict=True)
+    assert invoke(wrapped, outputs, [prop('in', 'value', 2)], triggered=['in.value']) == [4, 6]
+    with pytest.raises(PreventUpdate):
+        invoke(wrapped, outputs, [prop('in', 'value', 0)], triggered=['in.value'])
+    with pytest.raises(ValueError, match='backend down'):
+        invoke(dictionaryize(failing, *dependencies), outputs, [prop('in', 'value', 2)])
+
+
+def test_dcbu017_payload_budget():
+    def update(inputs, states):
+        output = DashDictCallbackPlugin.callback_dict({'small.children': 'ok', 'big.children': 'x' * 100})
+        output.pset(type='row', index=1, property='children', value=list(range(50)))
+        return output
+
+    dependencies = (Output('small', 'children'), Output('big', 'children'),
+                    Output({'type': 'row', 'index': ALL}, 'children'), Input('in', 'value'))
+    outputs = [prop('small', 'children'), prop('big', 'children'),
+               [prop({'type': 'row', 'index': 1}, 'children')]]
+
+    wrapped = dictionaryize(update, *dependencies, payload_budget=True)
+    invoke(wrapped, outputs, [prop('in', 'value')])
+    assert wrapped.payload['small.children'] == dict(last=4, max=4, total=4, count=1)
+    assert wrapped.payload['big.children']['max'] == 102
+    assert wrapped.payload['{"index":1,"type":"row"}.children']['count'] == 1
+
+    wrapped = dictionaryize(update, *dependencies, payload_budget=64)
+    with pytest.warns(DashDictCallbackPlugin.payload_warning) as record:
+        invoke(wrapped, outputs, [prop('in', 'value')])
+    message = str(record[0].message)
+    assert 'big.children (102 > 64 bytes)' in message and '{"index":1,"type":"row"}.children' in message
+    assert 'small.children' not in message
+
+    wrapped = dictionaryize(update, *dependencies, payload_budget={'big.children': 200,
+                                                                   'small.children': 2}, on_budget='raise')
+    with pytest.raises(DashDictCallbackPlugin.payload_too_large, match=r'small.children \(4 > 2 bytes\)$'):
+        invoke(wrapped, outputs, [prop('in', 'value')])
+
+
+def test_dcbu018_columnar():
+    def update(inputs, states):
+        column = inputs.pget({'type': 'in', 'index': ALL}, 'value')
+        assert isinstance(column, DashDictCallbackPlugin.callback_column)
+        assert column.field('index') == [0, 1, 2]
+        labels = states[(frozenset({'type': 'label', 'index': ALL}.items()), 'children')]
+        return {'total.children': sum(column.values), 'labels.children': list(labels),
+                'sizes.children': (len(column), len(labels)), 'other.children': inputs['other.value']}
+
+    dependencies = (Output('total', 'children'), Output('labels', 'children'), Output('sizes', 'children'),
+                    Output('other', 'children'), Input({'type': 'in', 'index': ALL}, 'value'),
+                    Input('other', 'value'), State({'type': 'label', 'index': ALL}, 'children'))
+    outputs = [prop('total', 'children'), prop('labels', 'children'), prop('sizes', 'children'),
+               prop('other', 'children')]
+    inputs = [[prop({'type': 'in', 'index': i}, 'value', i + 1) for i in range(3)], prop('other', 'value', 'x')]
+    states = [[prop({'type': 'label', 'index': i}, 'children', f'l{i}') for i in range(2)]]
+
+    for lazy in (False, True):
+        wrapped = dictionaryize(update, *dependencies, columnar=True, lazy=lazy)
+        assert invoke(wrapped, outputs, inputs, states) == [6, ['l0', 'l1'], (3, 2), 'x']
+    # Columns can be cached, the ids are part of the key
+    wrapped = dictionaryize(update, *dependencies, columnar=True, cache=True)
+    invoke(wrapped, outputs, inputs, states)
+    invoke(wrapped, outputs, inputs, states)
+    assert wrapped.cache.stats()['hits'] == 1
+
+
+def test_dcbu019_columnar_numpy():
+    numpy = pytest.importorskip('numpy')
+
+    def update(inputs, states):
+        column = inputs.pget({'type': 'in', 'index': ALL}, 'value')
+        assert isinstance(column.values, numpy.ndarray)
+        checked = numpy.asarray(column.field('index'))[column.values > 5000]
+        return {'count.children': int(len(checked)), 'first.children': int(checked[0])}
+
+    wrapped = dictionaryize(update, Output('count', 'children'), Output('first', 'children'),
+                            Input({'type': 'in', 'index': ALL}, 'value'), columnar='numpy')
+    inputs = [[prop({'type': 'in', 'index': i}, 'value', i) for i in range(10000)]]
+    assert invoke(wrapped, [prop('count', 'children'), prop('first', 'children')], inputs) == [4999, 5001]
+
+
+def test_dcbu020_standalone_dictionary():
+    from dash_dict_callback import dictionary
+
+    @dictionary(Output('total', 'children'), Output('label', 'children'), Input('a', 'value'),
+                [Input('b', 'value')], State('unit', 'value'), strict=True)
+    def total(inputs, states):
+        return {'total.children': inputs['a.value'] + inputs['b.value'], 'label.children': states['unit.value']}
+
+    # No app and no callback context needed
+    assert total(1, 2, 'kg') == [3, 'kg']
+    assert [total(i, i, 'g')[0] for i in range(3)] == [0, 2, 4]
+
+    @dictionary(Output('total', 'children'), Input('a', 'value'), strict=True)
+    def extra(inputs, states):
+        return {'total.children': 1, 'other.children': 2}
+
+    with pytest.raises(KeyError, match='other.children'):
+        extra(1)
+
+    @dictionary
+    def from_context(inputs, states):
+        return {'out.children': inputs['in.value']}
+
+    assert invoke(from_context, [prop('out', 'children')], [prop('in', 'value', 'x')]) == ['x']
+
+
+def test_dcbu021_coalesce():
+    from dash_dict_callback import dictionary
+
+    release = threading.Event()
+    calls = []
+
+    @dictionary(Output('out', 'children'), Input('in', 'value'), coalesce='global')
+    def slow(inputs, states):
+        calls.append(inputs['in.value'])
+        release.wait(5)
+        return {'out.children': [inputs['in.value']]}
+
+    with ThreadPoolExecutor(6) as pool:
+        same = [pool.submit(slow, 'x') for _ in range(5)]
+        other = pool.submit(slow, 'y')
+        # Wait for the identical calls to queue up behind the first one
+        while slow.coalesce.shared < 4:
+            threading.Event().wait(0.01)
+        release.set()
+        results = [future.result() for future in same]
+
+    assert results == [[['x']]] * 5
+    assert other.result() == [['y']]
+    assert sorted(calls) == ['x', 'y']
+    assert slow.coalesce.stats() == dict(executed=2, shared=4, in_flight=0)
+    # Once finished, the next call runs again
+    assert slow('x') == [['x']]
+    assert slow.coalesce.executed == 3
+
+    @dictionary(Output('out', 'children'), Input('in', 'value'), coalesce='global')
+    def prevented(inputs, states):
+        raise PreventUpdate
+
+    with pytest.raises(PreventUpdate):
+        prevented('x')
+    assert prevented.coalesce.stats()['in_flight'] == 0
+
+    # By default only the calls of the same session share an execution
+    user = threading.local()
+    release.clear()
+    calls.clear()
+
+    @dictionary(Output('out', 'children'), Input('in', 'value'), coalesce=True, session=lambda: user.name)
+    def private(inputs, states):
+        calls.append(user.name)
+        release.wait(5)
+        return {'out.children': user.name}
+
+    def call_as(name):
+        user.name = name
+        return private('x')
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(call_as, name) for name in ('alice', 'alice', 'bob', 'bob')]
+        while private.coalesce.shared < 2:
+            threading.Event().wait(0.01)
+        release.set()
+        assert [future.result() for future in futures] == [['alice'], ['alice'], ['bob'], ['bob']]
+    assert sorted(calls) == ['alice', 'bob']
+
+    with pytest.raises(ValueError):
+        dictionaryize(slow, Output('out', 'children'), Input('in', 'value'), coalesce='everyone')
+    app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+    with pytest.raises(ValueError, match='secret_key'):
+        app.dict_callback(Output('out', 'children'), Input('in', 'value'), coalesce=True)
+
+
+def test_dcbu022_supersede():
+    import dash_html_components as html
+    from helpers import post_callback
+
+    app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+    app.layout = html.Div()
+    started, release = threading.Event(), threading.Event()
+    checkpoints = []
+
+    # The sessions are kept in the flask session, which needs a secret key
+    with pytest.raises(ValueError, match='secret_key'):
+        app.dict_callback(Output('out', 'children'), Input('in', 'value'), supersede=True)
+    app.server.secret_key = 'test'
+
+    @app.dict_callback(Output('out', 'children'), Input('in', 'value'), supersede=True)
+    def search(inputs, states):
+        if inputs['in.value'] == 'slow':
+            started.set()
+            release.wait(5)
+            checkpoints.append(DashDictCallbackPlugin.superseded())
+            DashDictCallbackPlugin.checkpoint()
+        return {'out.children': inputs['in.value']}
+
+    def request(client, value):
+        return post_callback(app, '..out.children..', [prop('out', 'children')], [prop('in', 'value', value)],
+                             changed=['in.value'], client=client)
+
+    user, other_user = app.server.test_client(), app.server.test_client()
+    for client in (user, other_user):
+        # The first response sets the session cookie
+        assert request(client, 'first').status_code == 200
+
+    with ThreadPoolExecutor(1) as pool:
+        slow = pool.submit(request, user, 'slow')
+        assert started.wait(5)
+        # A request of another session doesn't supersede it
+        assert request(other_user, 'other').get_json()['response'] == {'out': {'children': 'other'}}
+        # The newer request of the same session supersedes the one still running
+        assert request(user, 'fast').get_json()['response'] == {'out': {'children': 'fast'}}
+        release.set()
+        assert slow.result().status_code == 204
+
+    assert checkpoints == [True]
+    assert search.supersede.stats() == dict(superseded=1, in_flight=0)
+    # Outside a superseded request the checkpoint lets the callback run
+    assert request(user, 'slow').get_json()['response'] == {'out': {'children': 'slow'}}
+    assert DashDictCallbackPlugin.superseded() is False
+
+
+def test_dcbu023_throttle_and_debounce():
+    import time
+    import dash_html_components as html
+    from helpers import post_callback
+
+    def user():
+        return flask.request.cookies.get('user')
+
+    def make_app(calls, **options):
+        app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+        app.layout = html.Div()
+
+        @app.dict_callback(Output('out', 'children'), Input('in', 'value'), session=user, **options)
+        def slider(inputs, states):
+            calls.append(inputs['in.value'])
+            return {'out.children': inputs['in.value']}
+
+        return app, slider
+
+    def client(app, name):
+        client = app.server.test_client()
+        client.set_cookie('localhost', 'user', name)
+        return client
+
+    def request(app, client, value):
+        response = post_callback(app, '..out.children..', [prop('out', 'children')],
+                                 [prop('in', 'value', value)], changed=['in.value'], client=client)
+        return response.get_json() and response.get_json()['response']['out']['children']
+
+    def burst(app, values, gap=0.05):
+        alice = client(app, 'alice')
+        with ThreadPoolExecutor(len(values)) as pool:
+            futures = []
+            for value in values:
+                futures.append(pool.submit(request, app, alice, value))
+                time.sleep(gap)
+            return [future.result() for future in futures]
+
+    calls = []
+    app, slider = make_app(calls, debounce=0.3)
+    assert burst(app, ['a', 'b', 'c']) == [None, None, 'c']
+    assert calls == ['c']
+    assert slider.rate_limit.stats() == dict(throttled=0, debounced=2, waiting=0, sessions=0)
+
+    # Throttled requests return right away rather than wait for the end of the interval
+    calls = []
+    app, slider = make_app(calls, throttle=2)
+    started = time.monotonic()
+    assert burst(app, ['a', 'b', 'c']) == ['a', None, None]
+    assert time.monotonic() - started < 1
+    assert calls == ['a']
+    assert slider.rate_limit.throttled == 2
+    # Other sessions have their own interval
+    assert request(app, client(app, 'bob'), 'd') == 'd'
+
+    calls = []
+    app, slider = make_app(calls, throttle=2, on_throttle='last')
+    assert burst(app, ['a', 'b', 'c']) == ['a', 'a', 'a']
+    assert calls == ['a']
+
+    calls = []
+    app, slider = make_app(calls, throttle=0.2)
+    alice = client(app, 'alice')
+    assert request(app, alice, 'a') == 'a'
+    time.sleep(0.3)
+    assert request(app, alice, 'b') == 'b'
+
+    with pytest.raises(ValueError):
+        make_app([], throttle=0)
+    # Without a session function the flask session is used, it needs a secret key
+    app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+    with pytest.raises(ValueError, match='secret_key'):
+        app.dict_callback(Output('out', 'children'), Input('in', 'value'), debounce=0.1)
+
+
+def test_dcbu024_timeout():
+    from dash_dict_callback import dictionary
+
+    def make(**options):
+        release = threading.Event()
+        budgets, stopped = [], []
+
+        @dictionary(Output('out', 'children'), Input('in', 'value'), timeout=0.2, **options)
+        def scan(inputs, states):
+            budgets.append(DashDictCallbackPlugin.remaining())
+            if inputs['in.value'] == 'slow':
+                release.wait(1)
+                try:
+                    DashDictCallbackPlugin.checkpoint()
+                except PreventUpdate:
+                    stopped.append(inputs['in.value'])
+                    raise
+            return {'out.children': inputs['in.value']}
+
+        return scan, release, budgets, stopped
+
+    scan, release, budgets, stopped = make()
+    assert scan('fast') == ['fast']
+    assert 0 < budgets[0] <= 0.2
+    with pytest.raises(PreventUpdate):
+        scan('slow')
+    assert scan.deadline.stats() == dict(calls=2, timeouts=1)
+    release.set()
+    # Past its deadline the abandoned call stops at its checkpoint
+    while not stopped:
+        threading.Event().wait(0.01)
+    assert DashDictCallbackPlugin.remaining() is None
+
+    scan, release, _, _ = make(on_timeout={'out.children': 'partial'}, cache=True)
+    assert scan('slow') == ['partial']
+    release.set()
+    assert len(scan.cache) == 0
+
+    release, slow = threading.Event(), set()
+
+    @dictionary(Output('out', 'children'), Input('in', 'value'), timeout=0.2, on_timeout='last')
+    def lookup(inputs, states):
+        if inputs['in.value'] in slow:
+            release.wait(1)
+        return {'out.children': inputs['in.value'] + '!'}
+
+    assert lookup('a') == ['a!'] and lookup('b') == ['b!']
+    slow.update(('a', 'c'))
+    # The last output of the same inputs is sent, never the one of other inputs
+    assert lookup('a') == ['a!']
+    with pytest.raises(PreventUpdate):
+        lookup('c')
+    release.set()
+
+    scan, release, _, _ = make(on_timeout=lambda inputs, states: {'out.children': inputs['in.value'] + '?'})
+    assert scan('slow') == ['slow?']
+    release.set()
+
+    scan, release, _, _ = make(on_timeout='raise')
+    with pytest.raises(DashDictCallbackPlugin.callback_timeout, match='0.2 seconds'):
+        scan('slow')
+    release.set()
+
+    with pytest.raises(ValueError):
+        make(on_timeout='later')
+
+
+def test_dcbu025_pkeys_ids_are_copies():
+    def display(inputs, states):
+        id_, _ = inputs.pkeys()[0]
+        index = id_['index']
+        # Editing the id handed out must not change the key of the next request
+        id_['type'] = 'dynamic-output'
+        output = DashDictCallbackPlugin.callback_dict()
+        output.pset(id_, 'children', f'Dropdown {index}')
+        return output
+
+    wrapped = dictionaryize(display, Output({'type': 'dynamic-output', 'index': MATCH}, 'children'),
+                            Input({'type': 'dynamic-dropdown', 'index': MATCH}, 'value'))
+    for _ in range(2):
+        assert invoke(wrapped, [prop({'type': 'dynamic-output', 'index': 1}, 'children')],
+                      [prop({'type': 'dynamic-dropdown', 'index': 1}, 'value', 'NYC')]) == ['Dropdown 1']
+        key = DashDictCallbackPlugin.pattern_key({'type': 'dynamic-dropdown', 'index': 1}, 'value')
+        assert key.id == {'type': 'dynamic-dropdown', 'index': 1}
+
+    values = DashDictCallbackPlugin.callback_dict()
+    values.pset(type='row', index=1, property='value', value=10)
+    values.pselect(type='row').pkeys()[0][0]['type'] = 'changed'
+    assert values.pkeys() == [({'type': 'row', 'index': 1}, 'value')]
+
+
+def test_dcbu026_parallel_process_pool():
+    import dash_html_components as html
+    from concurrent.futures import ProcessPoolExecutor
+    from helpers import post_callback
+
+    app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+    app.layout = html.Div()
+
+    def total(inputs, states):
+        return {'total.children': sum(inputs.values())}
+
+    dependencies = (Output('total', 'children'), Output('squares', 'children'),
+                    Input({'type': 'in', 'index': ALL}, 'value'))
+    # The decorated function can't be pickled, it runs in the request while square_sum runs in the pool
+    app.dict_callback(*dependencies, parallel=[square_sum], executor='process')(total)
+
+    inputs = [[prop({'type': 'in', 'index': i}, 'value', i) for i in range(4)]]
+    outputs = [prop('total', 'children'), prop('squares', 'children')]
+    response = post_callback(app, '..total.children...squares.children..', outputs, inputs)
+    assert response.status_code == 200
+    assert response.get_json()['response'] == {'total': {'children': 6}, 'squares': {'children': 14}}
+
+    with ProcessPoolExecutor(1) as pool:
+        wrapped = dictionaryize(total, *dependencies, parallel=[square_sum], executor=pool)
+        assert invoke(wrapped, outputs, inputs) == [6, 14]
+
+
+def test_dcbu027_timeout_with_process_executor():
+    from dash_dict_callback import dictionary
+
+    @dictionary(Output('out', 'children'), Input('in', 'value'), timeout=5, executor='process')
+    def scan(inputs, states):
+        return {'out.children': (inputs['in.value'], DashDictCallbackPlugin.remaining() > 0)}
+
+    assert scan('x') == [('x', True)]
+    assert scan.deadline.stats() == dict(calls=1, timeouts=0)
+
+
+def test_dcbu028_timeout_with_parallel_under_load():
+    def first(inputs, states):
+        time.sleep(0.02)
+        return {'a.children': inputs['in.value']}
+
+    def second(inputs, states):
+        time.sleep(0.02)
+        return {'b.children': inputs['in.value']}
+
+    with ThreadPoolExecutor(2) as pool:
+        # More concurrent requests than workers, the runners must not wait on their own pool
+        wrapped = dictionaryize(first, Output('a', 'children'), Output('b', 'children'), Input('in', 'value'),
+                                parallel=[second], executor=pool, timeout=2)
+        results = {}
+
+        def request(value):
+            results[value] = invoke(wrapped, [prop('a', 'children'), prop('b', 'children')],
+                                    [prop('in', 'value', value)])
+
+        threads = [threading.Thread(target=request, args=(value,)) for value in range(15)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        assert results == {value: [value, value] for value in range(15)}
+        assert wrapped.deadline.stats() == dict(calls=15, timeouts=0)
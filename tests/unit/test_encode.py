@@ -0,0 +1,120 @@
+import base64
+import datetime
+import json
+import warnings
+
+import dash
+import pytest
+import dash_html_components as html
+from dash.dependencies import Input, Output, ALL
+from dash_dict_callback import DashDictCallbackPlugin, encode
+
+from helpers import post_callback, prop
+
+
+def make_app(fast_json):
+    app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+    app.layout = html.Div()
+
+    @app.dict_callback(Output('when', 'children'), Output('tree', 'children'), Output('skip', 'children'),
+                       Output({'type': 'row', 'index': ALL}, 'children'), Input('in', 'value'), fast_json=fast_json)
+    def update(inputs, states):
+        output = DashDictCallbackPlugin.callback_dict({
+            'when.children': datetime.datetime(2021, 5, 4, 12, 30),
+            'tree.children': [html.Span('a', id='a'), {'big': 2 ** 70, 'nan': float('nan')}],
+        })
+        output.pset(type='row', index=1, property='children', value=inputs['in.value'])
+        return output
+
+    return app
+
+
+def call(app):
+    outputs = [prop('when', 'children'), prop('tree', 'children'), prop('skip', 'children'),
+               [prop({'type': 'row', 'index': 1}, 'children'), prop({'type': 'row', 'index': 2}, 'children')]]
+    callback_id = app._callback_list[0]['output']
+    return post_callback(app, callback_id, outputs, [prop('in', 'value', 'x')], changed=['in.value'])
+
+
+def test_dcbe001_fast_json_matches_dash():
+    app = make_app(True)
+    callback = app.callback_map[app._callback_list[0]['output']]['callback']
+    assert callback.__code__.co_filename == DashDictCallbackPlugin.fast_json_context.__code__.co_filename
+    fast, standard = call(app), call(make_app(False))
+    assert fast.status_code == standard.status_code == 200
+    assert fast.mimetype == 'application/json'
+    assert json.loads(fast.get_data()) == json.loads(standard.get_data())
+    assert json.loads(fast.get_data())['response']['{"index":1,"type":"row"}'] == {'children': 'x'}
+
+
+def test_dcbe002_dumps():
+    value = {'b': [1.5, None, float('inf')], 'a': datetime.date(2020, 1, 2), 'c': (1, 'x')}
+    assert json.loads(encode.dumps(value)) == json.loads(encode.standard_dumps(value))
+    assert list(json.loads(encode.dumps(value, sort_keys=True))) == ['a', 'b', 'c']
+
+
+def test_dcbe003_numpy_and_pandas_outputs():
+    numpy = pytest.importorskip('numpy')
+    x = numpy.linspace(0, 1, 1_000_000)
+    y = numpy.sin(x)
+    y[3] = numpy.nan
+    figure = {'data': [{'type': 'scattergl', 'x': x, 'y': y[::1]}]}
+    decoded = json.loads(encode.dumps(figure))
+    assert len(decoded['data'][0]['x']) == 1_000_000
+    assert decoded['data'][0]['x'][-1] == 1.0 and decoded['data'][0]['y'][3] is None
+    # Strided views and the standard encoder give the same values
+    assert json.loads(encode.dumps(x[::250_000])) == [0.0, 0.25000025000025, 0.5000005000005, 0.75000075000075]
+    assert json.loads(encode.dumps(x[::250_000])) == json.loads(encode.standard_dumps(x[::250_000]))
+
+    pandas = pytest.importorskip('pandas')
+    frame = pandas.DataFrame({'a': [1, 2, 3], 'when': pandas.to_datetime(['2021-01-01', '2021-01-02', None])})
+    assert json.loads(encode.dumps({'a': frame['a'], 'index': frame.index})) == {'a': [1, 2, 3], 'index': [0, 1, 2]}
+    assert json.loads(encode.dumps(frame['when']))[:2] == ['2021-01-01T00:00:00', '2021-01-02T00:00:00']
+
+
+def test_dcbe004_binary_arrays():
+    numpy = pytest.importorskip('numpy')
+    x = numpy.arange(1_000_000, dtype='f8')
+    trace = {'type': 'heatmap', 'x': x, 'z': numpy.array([[1, 2, 3], [4, 5, 6]], dtype='i8'),
+             'y': numpy.array([2 ** 40]), 'text': numpy.array(['a', 'b']), 'marker': {'size': x[:3]}}
+    figure = {'data': [trace], 'layout': {'xaxis': {'tickvals': x[:2]}}}
+    decoded = json.loads(encode.dumps(encode.binary_figure(figure)))
+    converted = decoded['data'][0]
+    assert converted['x']['dtype'] == 'f8'
+    assert numpy.array_equal(numpy.frombuffer(base64.b64decode(converted['x']['bdata']), '<f8'), x)
+    assert converted['z'] == {'dtype': 'i4', 'shape': '2,3',
+                              'bdata': base64.b64encode(numpy.arange(1, 7, dtype='<i4').tobytes()).decode()}
+    assert converted['y']['dtype'] == 'f8'
+    assert converted['text'] == ['a', 'b']
+    assert converted['marker']['size']['dtype'] == 'f8'
+    # Only the traces are converted, the figure itself isn't modified
+    assert decoded['layout'] == {'xaxis': {'tickvals': [0.0, 1.0]}}
+    assert figure['data'][0] is trace and trace['x'] is x
+    assert encode.binary_figure({'x': x})['x'] is x
+
+
+def test_dcbe005_binary_arrays_callback():
+    numpy = pytest.importorskip('numpy')
+    app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+    app.layout = html.Div()
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+
+        @app.dict_callback(Output('graph', 'figure'), Output('store', 'data'), Input('n', 'value'),
+                           binary_arrays=True)
+        def update(inputs, states):
+            x = numpy.linspace(0, 1, inputs['n.value'])
+            return {'graph.figure': {'data': [{'type': 'scattergl', 'x': x, 'y': x ** 2}]}, 'store.data': x[:3]}
+
+    version = encode.plotlyjs_version()
+    assert any('plotly.js 2.28' in str(warning.message) for warning in caught) == (version is not None
+                                                                                 and version < (2, 28))
+
+    response = post_callback(app, '..graph.figure...store.data..', [prop('graph', 'figure'), prop('store', 'data')],
+                             [prop('n', 'value', 1_000_000)], changed=['n.value'])
+    output = response.get_json()['response']
+    y = numpy.frombuffer(base64.b64decode(output['graph']['figure']['data'][0]['y']['bdata']), '<f8')
+    assert len(y) == 1_000_000 and y[-1] == 1.0
+    # Arrays outside of figures stay JSON numbers
+    assert output['store']['data'] == [0.0, 1 / 999_999, 2 / 999_999]
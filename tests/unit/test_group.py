@@ -0,0 +1,83 @@
+import dash
+import dash_html_components as html
+from dash.dependencies import Input, Output, State, ALL
+from dash_dict_callback import DashDictCallbackPlugin
+
+from helpers import post_callback, prop
+
+
+def make_app(calls):
+    app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+    app.layout = html.Div()
+
+    @app.dict_callback(Output('graph', 'figure'), Output('title', 'children'), Input('year', 'value'),
+                       group='graph')
+    def by_year(inputs, states):
+        calls.append('year')
+        return {'graph.figure': {'year': inputs['year.value']}, 'title.children': 'year'}
+
+    @app.dict_callback(Output('graph', 'figure'), Input({'type': 'filter', 'index': ALL}, 'value'),
+                       State('year', 'value'), group='graph')
+    def by_filter(inputs, states):
+        calls.append('filter')
+        return {'graph.figure': {'filters': inputs.pselect(type='filter').values().__next__()}}
+
+    return app
+
+
+def test_dcbg001_group_registers_one_callback():
+    app = make_app([])
+    assert len(app._callback_list) == 1
+    spec = app._callback_list[0]
+    assert spec['output'] == '..graph.figure...title.children..'
+    assert [i['id'] for i in spec['inputs']] == ['year', '{"index":["ALL"],"type":"filter"}']
+    assert [s['id'] for s in spec['state']] == ['year']
+
+
+def test_dcbg002_group_runs_triggered_members():
+    calls = []
+    app = make_app(calls)
+    callback_id = app._callback_list[0]['output']
+    outputs = [prop('graph', 'figure'), prop('title', 'children')]
+    inputs = [prop('year', 'value', 2020), [prop({'type': 'filter', 'index': 0}, 'value', 'a')]]
+    states = [prop('year', 'value', 2020)]
+
+    response = post_callback(app, callback_id, outputs, inputs, states, changed=['year.value'])
+    assert calls == ['year']
+    assert response.get_json()['response'] == {'graph': {'figure': {'year': 2020}}, 'title': {'children': 'year'}}
+
+    calls.clear()
+    response = post_callback(app, callback_id, outputs, inputs, states,
+                             changed=['{"index":0,"type":"filter"}.value'])
+    assert calls == ['filter']
+    assert response.get_json()['response'] == {'graph': {'figure': {'filters': 'a'}}}
+
+    # The initial call runs every member, the later one wins for shared outputs
+    calls.clear()
+    response = post_callback(app, callback_id, outputs, inputs, states)
+    assert calls == ['year', 'filter']
+    assert response.get_json()['response'] == {'graph': {'figure': {'filters': 'a'}}, 'title': {'children': 'year'}}
+
+
+def test_dcbg003_explicit_initial_call_with_app_default():
+    calls = []
+    app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin], prevent_initial_callbacks=True)
+    app.layout = html.Div()
+
+    @app.dict_callback(Output('title', 'children'), Input('year', 'value'), group='page',
+                       prevent_initial_call=False)
+    def title(inputs, states):
+        calls.append('title')
+        return {'title.children': inputs['year.value']}
+
+    @app.dict_callback(Output('graph', 'figure'), Input('year', 'value'), group='page')
+    def graph(inputs, states):
+        calls.append('graph')
+        return {'graph.figure': {}}
+
+    # The explicit False is kept, the other member follows the app default
+    assert app._callback_list[0]['prevent_initial_call'] is False
+    outputs = [prop('title', 'children'), prop('graph', 'figure')]
+    response = post_callback(app, app._callback_list[0]['output'], outputs, [prop('year', 'value', 2020)])
+    assert calls == ['title']
+    assert response.get_json()['response'] == {'title': {'children': 2020}}
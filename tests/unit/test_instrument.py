@@ -0,0 +1,85 @@
+import dash
+import dash_html_components as html
+import pytest
+from dash.dependencies import Input, Output
+from dash.exceptions import PreventUpdate
+from dash_dict_callback import DashDictCallbackPlugin
+from dash_dict_callback.instrument import callback_instrument, latency_aggregator, prometheus_text
+
+from helpers import dictionaryize, invoke, post_callback, prop
+
+
+class recorder(callback_instrument):
+    measure_output = True
+
+    def __init__(self):
+        self.before_records = []
+        self.records = []
+
+    def before(self, record):
+        self.before_records.append(record)
+
+    def after(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def instrument():
+    instrument = recorder()
+    DashDictCallbackPlugin.add_instrument(instrument)
+    yield instrument
+    DashDictCallbackPlugin.remove_instrument(instrument)
+
+
+def update(inputs, states):
+    if inputs['in.value'] is None:
+        return dash.no_update
+    return {'out.children': inputs['in.value'] * 2}
+
+
+def test_dcbi001_instrument_records(instrument):
+    wrapped = dictionaryize(update, Output('out', 'children'), Input('in', 'value'), strict=True, cache=True)
+    assert invoke(wrapped, [prop('out', 'children')], [prop('in', 'value', 'ab')], triggered=['in.value']) == ['abab']
+    assert invoke(wrapped, [prop('out', 'children')], [prop('in', 'value', 'ab')]) == ['abab']
+    with pytest.raises(PreventUpdate):
+        invoke(wrapped, [prop('out', 'children')], [prop('in', 'value', None)])
+
+    assert len(instrument.before_records) == 3
+    first, second, third = instrument.records
+    assert first['name'] == 'test_instrument.update'
+    assert first['triggered'] == ['in.value'] and second['triggered'] == []
+    assert set(first['timings']) == {'to_dict', 'callback', 'from_dict', 'strict'}
+    assert first['duration'] >= sum(first['timings'].values())
+    assert (first['cache_hit'], second['cache_hit']) == (False, True)
+    assert first['output_bytes'] == len('["abab"]')
+    assert (first['outcome'], third['outcome']) == ('ok', 'prevented')
+
+
+def test_dcbi002_aggregator_and_route(monkeypatch):
+    aggregator = latency_aggregator(window=3)
+    for duration in (0.4, 0.1, 0.2, 0.3):
+        aggregator.after(dict(name='cb', duration=duration, timings={'callback': duration}, outcome='ok',
+                              cache_hit=None))
+    stats = aggregator.summary()['cb']
+    assert stats['calls'] == 4 and stats['quantiles'] == {0.5: 0.2, 0.95: 0.3, 0.99: 0.3}
+    text = prometheus_text(aggregator)
+    assert 'dash_dict_callback_duration_seconds{callback="cb",quantile="0.5"} 0.200000000' in text
+    assert 'dash_dict_callback_duration_seconds_count{callback="cb"} 4' in text
+
+    app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+    # The route is only served once asked for
+    assert '/_dict-callback/metrics' not in [rule.rule for rule in app.server.url_map.iter_rules()]
+    monkeypatch.setattr(DashDictCallbackPlugin.__class__, 'serve_metrics', True)
+    app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+    app.layout = html.Div()
+    app.dict_callback(Output('out', 'children'), Input('in', 'value'))(update)
+    DashDictCallbackPlugin.metrics.clear()
+    DashDictCallbackPlugin.add_instrument(DashDictCallbackPlugin.metrics)
+    try:
+        post_callback(app, '..out.children..', [prop('out', 'children')], [prop('in', 'value', 'x')],
+                      changed=['in.value'])
+    finally:
+        DashDictCallbackPlugin.remove_instrument(DashDictCallbackPlugin.metrics)
+    response = app.server.test_client().get('/_dict-callback/metrics')
+    assert response.status_code == 200
+    assert 'dash_dict_callback_duration_seconds_count{callback="test_instrument.update"} 1' in response.get_data(True)
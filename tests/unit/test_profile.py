@@ -0,0 +1,93 @@
+import os
+import shutil
+
+import dash
+import dash_html_components as html
+from dash.dependencies import Input, Output
+from dash_dict_callback import DashDictCallbackPlugin
+from dash_dict_callback.profile import callback_profiler
+
+from helpers import dictionaryize, invoke, post_callback, prop
+
+
+def slow_part(value):
+    return sum(range(value))
+
+
+def update(inputs, states):
+    return {'out.children': slow_part(inputs['in.value'])}
+
+
+def test_dcbp001_sampled_profiles(tmp_path, monkeypatch):
+    profiler = callback_profiler(str(tmp_path), ring=2)
+    monkeypatch.setattr(DashDictCallbackPlugin.__class__, 'profiler', profiler)
+    wrapped = dictionaryize(update, Output('out', 'children'), Input('in', 'value'))
+
+    def call():
+        return invoke(wrapped, [prop('out', 'children')], [prop('in', 'value', 100000)])
+
+    assert call() == [4999950000]
+    assert profiler.files() == []
+
+    profiler.enable(update, every=2)
+    for _ in range(4):
+        call()
+    assert len(profiler.files()) == 2
+    profiler.enable(update, every=1)
+    for _ in range(3):
+        call()
+    # The ring only keeps the most recent profiles
+    assert len(profiler.files()) == 2
+    profiler.disable(update)
+    call()
+    assert len(profiler.files()) == 2
+
+    with open(tmp_path / profiler.files()[-1]) as f:
+        lines = f.read().splitlines()
+    stacks = [line.rpartition(' ')[0].split(';') for line in lines]
+    assert any(stack[-1].startswith('slow_part (test_profile.py:') and 'update (test_profile.py:17)' in stack
+               for stack in stacks)
+    assert all(int(line.rpartition(' ')[2]) > 0 for line in lines)
+
+
+def test_dcbp002_profiles_route(tmp_path, monkeypatch):
+    profiler = callback_profiler(str(tmp_path))
+    monkeypatch.setattr(DashDictCallbackPlugin.__class__, 'profiler', profiler)
+    app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+    # The routes are only served once asked for
+    assert '/_dict-callback/profiles' not in [rule.rule for rule in app.server.url_map.iter_rules()]
+    monkeypatch.setattr(DashDictCallbackPlugin.__class__, 'serve_profiles', True)
+    app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+    app.layout = html.Div()
+    app.dict_callback(Output('out', 'children'), Input('in', 'value'), profile=1)(update)
+    post_callback(app, '..out.children..', [prop('out', 'children')], [prop('in', 'value', 1000)],
+                  changed=['in.value'])
+
+    client = app.server.test_client()
+    profiles = client.get('/_dict-callback/profiles').get_json()
+    assert [profile['callback'] for profile in profiles] == ['test_profile.update']
+    response = client.get('/_dict-callback/profiles/' + profiles[0]['file'])
+    assert response.status_code == 200 and 'slow_part' in response.get_data(True)
+    assert client.get('/_dict-callback/profiles/missing.collapsed').status_code == 404
+
+
+def test_dcbp003_profiles_of_each_app(tmp_path, monkeypatch):
+    monkeypatch.setattr(DashDictCallbackPlugin.__class__, 'profiler', callback_profiler())
+    monkeypatch.setattr(DashDictCallbackPlugin.__class__, 'serve_profiles', True)
+    apps = []
+    for directory in (None, str(tmp_path)):
+        app = dash.Dash(__name__, plugins=[DashDictCallbackPlugin])
+        app.layout = html.Div()
+        if directory:
+            app.server.config['DICT_CALLBACK_PROFILES'] = directory
+        app.dict_callback(Output('out', 'children'), Input('in', 'value'), profile=1)(update)
+        apps.append(app)
+    post_callback(apps[0], '..out.children..', [prop('out', 'children')], [prop('in', 'value', 1000)],
+                  changed=['in.value'])
+
+    # The first app got a private temporary directory, the second one sees none of its profiles
+    first = apps[0].server.config['DICT_CALLBACK_PROFILES']
+    assert first != str(tmp_path) and len(os.listdir(first)) == 1
+    assert len(apps[0].server.test_client().get('/_dict-callback/profiles').get_json()) == 1
+    assert apps[1].server.test_client().get('/_dict-callback/profiles').get_json() == []
+    shutil.rmtree(first)